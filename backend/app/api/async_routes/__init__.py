@@ -0,0 +1,3 @@
+from app.api.async_routes import items, projects, tasks, users
+
+__all__ = ["items", "projects", "tasks", "users"]
@@ -0,0 +1,127 @@
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlmodel import col, select
+
+from app import async_crud
+from app.api.deps import AsyncCurrentUser, AsyncSessionDep
+from app.api.routing import PydanticJSONRoute
+from app.core.config import settings
+from app.models import (
+    CountStrategyEnum,
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
+
+router = APIRouter(prefix="/items", tags=["items"], route_class=PydanticJSONRoute)
+
+
+@router.get("/", response_model=ItemsPublic)
+async def read_items(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    cursor: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: CountStrategyEnum | None = None,
+) -> Any:
+    """
+    Retrieve items.
+    """
+
+    statement = select(Item)
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    count, count_strategy = await async_crud.count_rows(
+        session=session, statement=statement, strategy=count_strategy
+    )
+    try:
+        items, next_cursor = await async_crud.paginate(
+            session=session,
+            statement=statement,
+            keys=[col(Item.id)],
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ItemsPublic(
+        data=items, count=count, count_strategy=count_strategy, next_cursor=next_cursor
+    )
+
+
+@router.get("/{id}", response_model=ItemPublic)
+async def read_item(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, id: uuid.UUID
+) -> Any:
+    """
+    Get item by ID.
+    """
+    item = await session.get(Item, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return item
+
+
+@router.post("/", response_model=ItemPublic)
+async def create_item(
+    *, session: AsyncSessionDep, current_user: AsyncCurrentUser, item_in: ItemCreate
+) -> Any:
+    """
+    Create new item.
+    """
+    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
+    session.add(item)
+    await session.commit()
+    await session.refresh(item)
+    return item
+
+
+@router.put("/{id}", response_model=ItemPublic)
+async def update_item(
+    *,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    id: uuid.UUID,
+    item_in: ItemUpdate,
+) -> Any:
+    """
+    Update an item.
+    """
+    item = await session.get(Item, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    update_dict = item_in.model_dump(exclude_unset=True)
+    item.sqlmodel_update(update_dict)
+    session.add(item)
+    await session.commit()
+    await session.refresh(item)
+    return item
+
+
+@router.delete("/{id}")
+async def delete_item(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, id: uuid.UUID
+) -> Message:
+    """
+    Delete an item.
+    """
+    item = await session.get(Item, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    await session.delete(item)
+    await session.commit()
+    return Message(message="Item deleted successfully")
@@ -0,0 +1,130 @@
+import uuid
+from typing import Annotated, Any, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from sqlmodel import select
+
+from app import async_crud
+from app.api.deps import (
+    AsyncReadCurrentUser,
+    AsyncReadSessionDep,
+    get_project_role_async_read,
+    require_project_role,
+)
+from app.api.etags import make_etag, not_modified
+from app.api.routing import PydanticJSONRoute
+from app.core.config import settings
+from app.crud import parse_project_includes
+from app.models import (
+    CountStrategyEnum,
+    Project,
+    ProjectDetailPublic,
+    ProjectRoleEnum,
+    ProjectsPublic,
+    Task,
+    TaskPublic,
+)
+
+router = APIRouter(prefix="/projects", tags=["projects"], route_class=PydanticJSONRoute)
+
+
+@router.get("/", response_model=ProjectsPublic)
+async def read_projects(
+    session: AsyncReadSessionDep,
+    current_user: AsyncReadCurrentUser,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: Optional[CountStrategyEnum] = None,
+) -> Any:
+    """Retrieve all projects (Only for Superusers)."""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    count, count_strategy = await async_crud.count_rows(
+        session=session, statement=select(Project), strategy=count_strategy
+    )
+    try:
+        projects, next_cursor = await async_crud.list_projects(
+            session=session, cursor=cursor, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProjectsPublic(
+        data=projects,
+        count=count,
+        count_strategy=count_strategy,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get(
+    "/{project_id}",
+    dependencies=[
+        require_project_role(ProjectRoleEnum.VIEWER, get_project_role_async_read)
+    ],
+    response_model=ProjectDetailPublic,
+    response_model_exclude_unset=True,
+)
+async def read_project(
+    session: AsyncReadSessionDep,
+    project_id: uuid.UUID,
+    response: Response,
+    include: Optional[str] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
+    """
+    Retrieve a single project by ID.
+
+    `include` is a comma-separated list of owner, members, members.user and tasks.
+    """
+    try:
+        includes = parse_project_includes(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not includes:
+        # The ETag only covers the project row itself
+        version = await async_crud.get_project_version(
+            session=session, project_id=project_id
+        )
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        cached = not_modified(if_none_match, make_etag(version), response)
+        if cached:
+            return cached
+    project = await async_crud.get_project_detail(
+        session=session, project_id=project_id, include=includes
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+@router.get(
+    "/{project_id}/tasks/",
+    dependencies=[
+        require_project_role(ProjectRoleEnum.VIEWER, get_project_role_async_read)
+    ],
+    response_model=List[TaskPublic],
+)
+async def get_tasks_by_project_id(
+    *,
+    session: AsyncReadSessionDep,
+    project_id: uuid.UUID,
+    response: Response,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
+    if (
+        await async_crud.get_project_version(session=session, project_id=project_id)
+        is None
+    ):
+        raise HTTPException(status_code=404, detail="Project not found")
+    etag = make_etag(
+        *await async_crud.get_project_tasks_version(
+            session=session, project_id=project_id
+        )
+    )
+    cached = not_modified(if_none_match, etag, response)
+    if cached:
+        return cached
+    return (await session.exec(select(Task).where(Task.project_id == project_id))).all()
@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import Annotated, Any, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlmodel import select
+
+from app import async_crud
+from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncReadSessionDep,
+    AsyncSessionDep,
+    get_current_user_async_read,
+    get_task_async,
+    get_task_async_read,
+    get_task_project_role_async,
+    get_task_project_role_async_read,
+    require_project_role,
+)
+from app.api.etags import make_etag, not_modified
+from app.api.routing import PydanticJSONRoute
+from app.core.config import settings
+from app.crud import invalidate_project_cache
+from app.models import (
+    CountStrategyEnum,
+    ProjectRoleEnum,
+    Task,
+    TaskCommentPublic,
+    TaskCommentsPublic,
+    TasksPublic,
+)
+
+router = APIRouter(prefix="/tasks", tags=["tasks"], route_class=PydanticJSONRoute)
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_user_async_read)],
+    response_model=TasksPublic,
+)
+async def read_tasks(
+    session: AsyncReadSessionDep,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: Optional[CountStrategyEnum] = None,
+) -> Any:
+    """Retrieve all tasks."""
+
+    count, count_strategy = await async_crud.count_rows(
+        session=session, statement=select(Task), strategy=count_strategy
+    )
+    try:
+        tasks, next_cursor = await async_crud.list_tasks(
+            session=session, cursor=cursor, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TasksPublic(
+        data=tasks, count=count, count_strategy=count_strategy, next_cursor=next_cursor
+    )
+
+
+@router.post(
+    "/{task_id}/comments",
+    dependencies=[
+        require_project_role(ProjectRoleEnum.VIEWER, get_task_project_role_async)
+    ],
+    response_model=TaskCommentPublic,
+)
+async def add_comment(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    task: Annotated[Task, Depends(get_task_async)],
+    content: str,
+) -> Any:
+    """Add a comment to a task. Any user in the project can comment."""
+    # The task the role check loaded, FastAPI resolves get_task_async once per request
+    task_id, project_id = task.id, task.project_id
+    comment = await async_crud.add_task_comment(
+        session=session, task_id=task_id, author_id=current_user.id, content=content
+    )
+    invalidate_project_cache(project_id)
+    return comment
+
+
+@router.get(
+    "/{task_id}/comments",
+    dependencies=[
+        require_project_role(ProjectRoleEnum.VIEWER, get_task_project_role_async_read)
+    ],
+    response_model=TaskCommentsPublic,
+)
+async def get_task_comments(
+    session: AsyncReadSessionDep,
+    task: Annotated[Task, Depends(get_task_async_read)],
+    response: Response,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
+    """Retrieve a task's comments, oldest first, a page at a time."""
+    if after and before:
+        raise HTTPException(
+            status_code=400, detail="Use either after or before, not both"
+        )
+    task_id = task.id
+    # A page only changes when the task's comments do, whatever the cursor
+    etag = make_etag(
+        *await async_crud.get_task_comments_version(session=session, task_id=task_id)
+    )
+    cached = not_modified(if_none_match, etag, response)
+    if cached:
+        return cached
+
+    try:
+        comments, next_cursor, prev_cursor = await async_crud.get_comments_for_task(
+            session=session,
+            task_id=task_id,
+            after=after,
+            before=before,
+            since=since,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TaskCommentsPublic(
+        data=comments, next_cursor=next_cursor, prev_cursor=prev_cursor
+    )
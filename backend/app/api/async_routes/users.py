@@ -0,0 +1,106 @@
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import col, select
+
+from app import async_crud
+from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
+    get_current_active_superuser_async,
+)
+from app.api.routing import PydanticJSONRoute
+from app.core.cache import current_user_cache
+from app.core.config import settings
+from app.models import CountStrategyEnum, User, UserPublic, UsersPublic, UserUpdateMe
+
+router = APIRouter(prefix="/users", tags=["users"], route_class=PydanticJSONRoute)
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_active_superuser_async)],
+    response_model=UsersPublic,
+)
+async def read_users(
+    session: AsyncSessionDep,
+    cursor: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: CountStrategyEnum | None = None,
+) -> Any:
+    """
+    Retrieve users.
+    """
+
+    count, count_strategy = await async_crud.count_rows(
+        session=session, statement=select(User), strategy=count_strategy
+    )
+
+    try:
+        users, next_cursor = await async_crud.paginate(
+            session=session,
+            statement=select(User),
+            keys=[col(User.id)],
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return UsersPublic(
+        data=users, count=count, count_strategy=count_strategy, next_cursor=next_cursor
+    )
+
+
+@router.patch("/me", response_model=UserPublic)
+async def update_user_me(
+    *, session: AsyncSessionDep, user_in: UserUpdateMe, current_user: AsyncCurrentUser
+) -> Any:
+    """
+    Update own user.
+    """
+
+    if user_in.email:
+        existing_user = await async_crud.get_user_by_email(
+            session=session, email=user_in.email
+        )
+        if existing_user and existing_user.id != current_user.id:
+            raise HTTPException(
+                status_code=409, detail="User with this email already exists"
+            )
+    user_data = user_in.model_dump(exclude_unset=True)
+    current_user.sqlmodel_update(user_data)
+    session.add(current_user)
+    await session.commit()
+    current_user_cache.invalidate(str(current_user.id))
+    await session.refresh(current_user)
+    return current_user
+
+
+@router.get("/me", response_model=UserPublic)
+async def read_user_me(current_user: AsyncCurrentUser) -> Any:
+    """
+    Get current user.
+    """
+    return current_user
+
+
+@router.get("/{user_id}", response_model=UserPublic)
+async def read_user_by_id(
+    user_id: uuid.UUID, session: AsyncSessionDep, current_user: AsyncCurrentUser
+) -> Any:
+    """
+    Get a specific user by id.
+    """
+    user = await session.get(User, user_id)
+    if user == current_user:
+        return user
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403,
+            detail="The user doesn't have enough privileges",
+        )
+    return user
@@ -1,44 +1,126 @@
-from collections.abc import Generator
-from typing import Annotated
+import math
+import uuid
+from collections.abc import AsyncGenerator, Callable, Generator
+from typing import Annotated, Any
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app import async_crud, crud
 from app.core import security
+from app.core.cache import current_user_cache, primary_pin_cache
 from app.core.config import settings
-from app.core.db import engine
-from app.models import TokenPayload, User
+from app.core.db import async_engine, engine, replicas
+from app.models import ProjectRoleEnum, Task, TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
 
-def get_db() -> Generator[Session, None, None]:
+# Set for DB_PRIMARY_PIN_SECONDS after a write, sends the browser's reads to the primary
+PRIMARY_PIN_COOKIE = "db_primary_pin"
+
+
+def pin_to_primary(request: Request, response: Response) -> None:
+    """Read from the primary for a while, so the client sees its own writes."""
+    response.set_cookie(
+        PRIMARY_PIN_COOKIE,
+        "1",
+        max_age=math.ceil(settings.DB_PRIMARY_PIN_SECONDS),
+        httponly=True,
+        samesite="lax",
+        secure=settings.ENVIRONMENT != "local",
+    )
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        primary_pin_cache.set(authorization, True)
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    if PRIMARY_PIN_COOKIE in request.cookies:
+        return True
+    authorization = request.headers.get("Authorization")
+    return bool(authorization and primary_pin_cache.get(authorization))
+
+
+def get_db(request: Request, response: Response) -> Generator[Session, None, None]:
     with Session(engine) as session:
+        if replicas:
+            event.listen(
+                session, "after_commit", lambda _: pin_to_primary(request, response)
+            )
+        yield session
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Session on a read replica for read-only routes. Falls back to the
+    primary when no replica is configured or healthy, and for clients that
+    wrote in the last DB_PRIMARY_PIN_SECONDS.
+    """
+    read_engine = None
+    if replicas and not is_pinned_to_primary(request):
+        read_engine = replicas.choose()
+    with Session(read_engine or engine) as session:
+        yield session
+
+
+async def get_async_db(
+    request: Request, response: Response
+) -> AsyncGenerator[AsyncSession, None]:
+    # Lazy loads can't run on an async session, so keep attributes loaded
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        if replicas:
+            event.listen(
+                session.sync_session,
+                "after_commit",
+                lambda _: pin_to_primary(request, response),
+            )
+        yield session
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Async twin of get_read_db(), for the async read-only routes."""
+    read_engine = None
+    if replicas and not is_pinned_to_primary(request):
+        # A due health check connects synchronously
+        read_engine = await run_in_threadpool(replicas.choose_async)
+    async with AsyncSession(
+        read_engine or async_engine, expire_on_commit=False
+    ) as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+
+
+def check_user(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -46,7 +128,56 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+def detached_user(snapshot: dict[str, Any]) -> User:
+    # Merging a detached instance with load=False attaches it without a query
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def load_current_user(session: Session, token: str) -> User:
+    token_data = decode_token(token)
+    snapshot = current_user_cache.get(token_data.sub)
+    if snapshot is not None:
+        return check_user(session.merge(detached_user(snapshot), load=False))
+    user = check_user(session.get(User, token_data.sub))
+    current_user_cache.set(str(user.id), user.model_dump())
+    return user
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    return load_current_user(session, token)
+
+
+def get_current_user_read(session: ReadSessionDep, token: TokenDep) -> User:
+    # For read-only routes, so they open no session on the primary
+    return load_current_user(session, token)
+
+
+async def load_current_user_async(session: AsyncSession, token: str) -> User:
+    token_data = decode_token(token)
+    snapshot = current_user_cache.get(token_data.sub)
+    if snapshot is not None:
+        return check_user(await session.merge(detached_user(snapshot), load=False))
+    user = check_user(await session.get(User, token_data.sub))
+    current_user_cache.set(str(user.id), user.model_dump())
+    return user
+
+
+async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+    return await load_current_user_async(session, token)
+
+
+async def get_current_user_async_read(
+    session: AsyncReadSessionDep, token: TokenDep
+) -> User:
+    return await load_current_user_async(session, token)
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+ReadCurrentUser = Annotated[User, Depends(get_current_user_read)]
+AsyncCurrentUser = Annotated[User, Depends(get_current_user_async)]
+AsyncReadCurrentUser = Annotated[User, Depends(get_current_user_async_read)]
 
 
 def get_current_active_superuser(current_user: CurrentUser) -> User:
@@ -55,3 +186,159 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def get_current_active_superuser_async(current_user: AsyncCurrentUser) -> User:
+    return get_current_active_superuser(current_user)
+
+
+# ---- PROJECT ROLES ----
+# A role may do everything the roles ranked below it may
+PROJECT_ROLE_RANKS = {
+    ProjectRoleEnum.VIEWER: 0,
+    ProjectRoleEnum.EMPLOYEE: 1,
+    ProjectRoleEnum.MANAGER: 2,
+    ProjectRoleEnum.OWNER: 3,
+}
+
+
+def has_project_role(role: ProjectRoleEnum | None, minimum: ProjectRoleEnum) -> bool:
+    return role is not None and PROJECT_ROLE_RANKS[role] >= PROJECT_ROLE_RANKS[minimum]
+
+
+def load_task(session: Session, task_id: uuid.UUID) -> Task:
+    # Kept in the session's identity map, so a later session.get() of the
+    # task without a lock needs no query
+    task = session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+def get_task(session: SessionDep, task_id: uuid.UUID) -> Task:
+    return load_task(session, task_id)
+
+
+def get_task_read(session: ReadSessionDep, task_id: uuid.UUID) -> Task:
+    return load_task(session, task_id)
+
+
+async def load_task_async(session: AsyncSession, task_id: uuid.UUID) -> Task:
+    task = await session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+async def get_task_async(session: AsyncSessionDep, task_id: uuid.UUID) -> Task:
+    return await load_task_async(session, task_id)
+
+
+async def get_task_async_read(session: AsyncReadSessionDep, task_id: uuid.UUID) -> Task:
+    return await load_task_async(session, task_id)
+
+
+# Superusers act as owners of every project. FastAPI resolves each of these
+# once per request, however many dependencies of a route ask for the role.
+def load_project_role(
+    session: Session, current_user: User, project_id: uuid.UUID
+) -> ProjectRoleEnum | None:
+    if current_user.is_superuser:
+        return ProjectRoleEnum.OWNER
+    return crud.get_project_role(
+        session=session, project_id=project_id, user_id=current_user.id
+    )
+
+
+def get_project_role(
+    session: SessionDep, current_user: CurrentUser, project_id: uuid.UUID
+) -> ProjectRoleEnum | None:
+    return load_project_role(session, current_user, project_id)
+
+
+def get_project_role_read(
+    session: ReadSessionDep, current_user: ReadCurrentUser, project_id: uuid.UUID
+) -> ProjectRoleEnum | None:
+    return load_project_role(session, current_user, project_id)
+
+
+async def load_project_role_async(
+    session: AsyncSession, current_user: User, project_id: uuid.UUID
+) -> ProjectRoleEnum | None:
+    if current_user.is_superuser:
+        return ProjectRoleEnum.OWNER
+    return await async_crud.get_project_role(
+        session=session, project_id=project_id, user_id=current_user.id
+    )
+
+
+async def get_project_role_async(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, project_id: uuid.UUID
+) -> ProjectRoleEnum | None:
+    return await load_project_role_async(session, current_user, project_id)
+
+
+async def get_project_role_async_read(
+    session: AsyncReadSessionDep,
+    current_user: AsyncReadCurrentUser,
+    project_id: uuid.UUID,
+) -> ProjectRoleEnum | None:
+    return await load_project_role_async(session, current_user, project_id)
+
+
+def get_task_project_role(
+    session: SessionDep,
+    current_user: CurrentUser,
+    task: Annotated[Task, Depends(get_task)],
+) -> ProjectRoleEnum | None:
+    return load_project_role(session, current_user, task.project_id)
+
+
+def get_task_project_role_read(
+    session: ReadSessionDep,
+    current_user: ReadCurrentUser,
+    task: Annotated[Task, Depends(get_task_read)],
+) -> ProjectRoleEnum | None:
+    return load_project_role(session, current_user, task.project_id)
+
+
+async def get_task_project_role_async(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    task: Annotated[Task, Depends(get_task_async)],
+) -> ProjectRoleEnum | None:
+    return await get_project_role_async(session, current_user, task.project_id)
+
+
+async def get_task_project_role_async_read(
+    session: AsyncReadSessionDep,
+    current_user: AsyncReadCurrentUser,
+    task: Annotated[Task, Depends(get_task_async_read)],
+) -> ProjectRoleEnum | None:
+    return await load_project_role_async(session, current_user, task.project_id)
+
+
+ProjectRole = Annotated[ProjectRoleEnum | None, Depends(get_project_role)]
+TaskProjectRole = Annotated[ProjectRoleEnum | None, Depends(get_task_project_role)]
+
+
+def require_project_role(
+    minimum: ProjectRoleEnum,
+    role_dependency: Callable[..., Any] = get_project_role,
+) -> Any:
+    """
+    Dependency that rejects callers below `minimum` in the project of the
+    route, found by `role_dependency` from the `project_id` path parameter
+    by default. Non-members get a 403 whether or not the project exists.
+    Read-only routes pass a `*_read` role dependency, which resolves the user
+    and role on the read session.
+    """
+
+    def check_role(
+        role: Annotated[ProjectRoleEnum | None, Depends(role_dependency)],
+    ) -> ProjectRoleEnum:
+        if not has_project_role(role, minimum):
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        return role  # type: ignore[return-value]
+
+    return Depends(check_role)
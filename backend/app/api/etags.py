@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import HTTPException, Response
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def etag_part(part: Any) -> str:
+    if part is None:
+        return ""
+    if isinstance(part, datetime):
+        # Epoch microseconds, str() has a space that is not allowed in a tag.
+        # Naive datetimes are UTC.
+        if part.tzinfo is None:
+            part = part.replace(tzinfo=timezone.utc)
+        return str((part - EPOCH) // timedelta(microseconds=1))
+    return str(part)
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag built from row versions and timestamps, e.g. `"42"` or
+    `"3-1792266114052099"`.
+    """
+    return '"' + "-".join(etag_part(part) for part in parts) + '"'
+
+
+def etag_matches(header: str | None, etag: str, *, weak: bool = True) -> bool:
+    """
+    Whether `etag` is listed in an If-None-Match or If-Match header.
+
+    If-None-Match uses the weak comparison, If-Match the strong one where
+    W/ tags never match.
+    """
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified(
+    if_none_match: str | None, etag: str, response: Response
+) -> Response | None:
+    """
+    Return a bodiless 304 when the client already has `etag`, otherwise set
+    the ETag header on `response` and return None so the route loads the data.
+    """
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+
+def check_if_match(if_match: str | None, etag: str) -> None:
+    """Reject a write whose If-Match no longer names the current version."""
+    if if_match is not None and not etag_matches(if_match, etag, weak=False):
+        raise HTTPException(
+            status_code=412, detail="The resource was modified by another request"
+        )
@@ -1,44 +1,60 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, HTTPException, Query
+from sqlmodel import col, select
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app.api.routing import PydanticJSONRoute
+from app.core.config import settings
+from app.models import (
+    CountStrategyEnum,
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(prefix="/items", tags=["items"], route_class=PydanticJSONRoute)
 
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    cursor: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: CountStrategyEnum | None = None,
 ) -> Any:
     """
     Retrieve items.
     """
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    statement = select(Item)
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    count, count_strategy = crud.count_rows(
+        session=session, statement=statement, strategy=count_strategy
+    )
+    try:
+        items, next_cursor = crud.paginate(
+            session=session,
+            statement=statement,
+            keys=[col(Item.id)],
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
         )
-        items = session.exec(statement).all()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return ItemsPublic(data=items, count=count)
+    return ItemsPublic(
+        data=items, count=count, count_strategy=count_strategy, next_cursor=next_cursor
+    )
 
 
 @router.get("/{id}", response_model=ItemPublic)
@@ -1,31 +1,71 @@
+import csv
+import io
+import json
 import uuid
-from typing import Any, List, Optional
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import func, select, Session
-from app.api.deps import CurrentUser,get_current_active_superuser, SessionDep
+from collections.abc import Iterator
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, Any, List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Engine
+from sqlmodel import select, Session
+from app.api.deps import (
+    ReadCurrentUser,
+    ReadSessionDep,
+    SessionDep,
+    get_current_active_superuser,
+    get_project_role_read,
+    has_project_role,
+    require_project_role,
+)
+from app.api.routing import PydanticJSONRoute
+from app.api.etags import check_if_match, make_etag, not_modified
+from app.core.config import settings
+from app.project_events import event_broker
 from app.models import (
+    CountStrategyEnum,
+    ProjectDetailPublic,
     ProjectPublic,
     ProjectCreate,
     ProjectMember,
+    ProjectMemberBulkItem,
+    ProjectMembersBulkPublic,
     Task,
+    TaskCreate,
     TaskPublic,
+    TasksBulkPublic,
+    TasksBulkUpdate,
+    TasksPublic,
     ProjectRoleEnum,
     User,
     ProjectsPublic,
+    ProjectSummary,
     Project,
     ProjectUpdate
 )
 from app.crud import (
+    count_rows,
     create_project,
     get_project_by_id,
     list_projects,
     delete_project,
     add_member_to_project,
+    create_tasks_bulk,
+    iter_project_export,
+    EXPORT_BATCH_SIZE,
+    get_project_detail,
+    parse_project_includes,
+    get_project_tasks_version,
+    get_project_version,
+    get_project_summary,
     remove_member_from_project,
+    update_members_bulk,
+    update_tasks_bulk,
 )
 
 
-router = APIRouter(prefix="/projects", tags=["projects"])
+router = APIRouter(prefix="/projects", tags=["projects"], route_class=PydanticJSONRoute)
 
 
 # ---- PROJECT ENDPOINTS ----
@@ -39,7 +79,7 @@ def create_new_project(
     """
     Create a new project. Only superusers can create projects.
     """
-    
+
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
@@ -47,33 +87,95 @@ def create_new_project(
     return project
 
 @router.get("/", response_model=ProjectsPublic)
-def read_projects(session: SessionDep, current_user: CurrentUser) -> Any:
+def read_projects(
+    session: ReadSessionDep,
+    current_user: ReadCurrentUser,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: Optional[CountStrategyEnum] = None,
+) -> Any:
     """Retrieve all projects (Only for Superusers)."""
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    count_statement = select(func.count()).select_from(Project)
-    count = session.exec(count_statement).one()
-    return ProjectsPublic(data=list_projects(session=session), count=count)
 
+    count, count_strategy = count_rows(
+        session=session, statement=select(Project), strategy=count_strategy
+    )
+    try:
+        projects, next_cursor = list_projects(
+            session=session, cursor=cursor, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProjectsPublic(
+        data=projects,
+        count=count,
+        count_strategy=count_strategy,
+        next_cursor=next_cursor,
+    )
 
-@router.get("/{project_id}", response_model=ProjectPublic)
-def read_project(session: SessionDep, current_user: CurrentUser, project_id: uuid.UUID) -> Any:
-    """Retrieve a single project by ID."""
-    project = get_project_by_id(session=session, project_id=project_id)
+
+@router.get(
+    "/{project_id}",
+    dependencies=[require_project_role(ProjectRoleEnum.VIEWER, get_project_role_read)],
+    response_model=ProjectDetailPublic,
+    response_model_exclude_unset=True,
+)
+def read_project(
+    session: ReadSessionDep,
+    current_user: ReadCurrentUser,
+    project_id: uuid.UUID,
+    response: Response,
+    include: Optional[str] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
+    """
+    Retrieve a single project by ID.
+
+    `include` is a comma-separated list of owner, members, members.user and tasks.
+    """
+    try:
+        includes = parse_project_includes(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not includes:
+        # The ETag only covers the project row itself
+        version = get_project_version(session=session, project_id=project_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        cached = not_modified(if_none_match, make_etag(version), response)
+        if cached:
+            return cached
+    project = get_project_detail(
+        session=session, project_id=project_id, include=includes
+    )
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return project
 
 
-@router.delete("/{project_id}")
-def remove_project(session: SessionDep, current_user: CurrentUser, project_id: uuid.UUID) -> Any:
+@router.get(
+    "/{project_id}/summary",
+    dependencies=[require_project_role(ProjectRoleEnum.VIEWER, get_project_role_read)],
+    response_model=ProjectSummary,
+)
+def read_project_summary(session: ReadSessionDep, project_id: uuid.UUID) -> Any:
+    """Task counts of a project by status and by member, for its dashboard."""
+    project = get_project_by_id(session=session, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return get_project_summary(session=session, project_id=project_id)
+
+
+@router.delete(
+    "/{project_id}", dependencies=[require_project_role(ProjectRoleEnum.OWNER)]
+)
+def remove_project(session: SessionDep, project_id: uuid.UUID) -> Any:
     """Delete a project. Only the project owner or superuser can delete."""
     project = get_project_by_id(session=session, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if project.owner_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
 
     delete_project(session=session, project_id=project_id)
     return {"message": "Project deleted successfully"}
@@ -82,33 +184,74 @@ def remove_project(session: SessionDep, current_user: CurrentUser, project_id: u
 # ---- PROJECT MEMBERS ENDPOINTS ----
 @router.post("/{project_id}/members", response_model=ProjectMember)
 def add_member(
-    session: SessionDep, current_user: CurrentUser, project_id: uuid.UUID, user_id: uuid.UUID, role: ProjectRoleEnum
+    session: SessionDep,
+    project_id: uuid.UUID,
+    user_id: uuid.UUID,
+    role: ProjectRoleEnum,
+    current_role: ProjectRoleEnum = require_project_role(ProjectRoleEnum.MANAGER),
 ) -> Any:
     """Add a member to a project. Only Managers and Owners can add members."""
     project = get_project_by_id(session=session, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if project.owner_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if not has_project_role(current_role, role):
+        raise HTTPException(
+            status_code=403, detail="Cannot grant a role above your own"
+        )
 
-    return add_member_to_project(session=session, project_id=project_id, user_id=user_id, role=role)
+    return add_member_to_project(
+        session=session, project_id=project_id, user_id=user_id, role=role
+    )
 
 
-@router.delete("/{project_id}/members/{user_id}")
-def remove_member(session: SessionDep, current_user: CurrentUser, project_id: uuid.UUID, user_id: uuid.UUID) -> Any:
+@router.post(
+    "/{project_id}/members:bulk",
+    dependencies=[require_project_role(ProjectRoleEnum.OWNER)],
+    response_model=ProjectMembersBulkPublic,
+)
+def update_members_in_bulk(
+    *,
+    session: SessionDep,
+    project_id: uuid.UUID,
+    members_in: List[ProjectMemberBulkItem],
+) -> Any:
+    """Add, update or remove many project members at once and return the roster."""
+    project = get_project_by_id(session=session, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if len(members_in) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_MAX_ROWS} members can be updated at once",
+        )
+
+    members, errors = update_members_bulk(
+        session=session, project_id=project_id, members_in=members_in
+    )
+    return ProjectMembersBulkPublic(data=members, errors=errors)
+
+
+@router.delete(
+    "/{project_id}/members/{user_id}",
+    dependencies=[require_project_role(ProjectRoleEnum.OWNER)],
+)
+def remove_member(
+    session: SessionDep, project_id: uuid.UUID, user_id: uuid.UUID
+) -> Any:
     """Remove a member from a project. Only project owners can remove members."""
     project = get_project_by_id(session=session, project_id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if project.owner_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    removed = remove_member_from_project(session=session, project_id=project_id, user_id=user_id)
+    removed = remove_member_from_project(
+        session=session, project_id=project_id, user_id=user_id
+    )
     if not removed:
         raise HTTPException(status_code=404, detail="User not found in project")
 
     return {"message": "User removed successfully"}
 
+
 @router.patch(
     "/{project_id}",
     dependencies=[Depends(get_current_active_superuser)],
@@ -119,17 +262,21 @@ def update_project(
     session: SessionDep,
     project_id: uuid.UUID,
     project_in: ProjectUpdate,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ) -> Any:
     """
     Update a project.
     """
-    # Retrieve the existing project
-    db_project = session.get(Project, project_id)
+    # Retrieve the existing project, locked until commit when the client
+    # asked for optimistic concurrency
+    db_project = session.get(Project, project_id, with_for_update=if_match is not None)
     if not db_project:
         raise HTTPException(
             status_code=404,
             detail="The project with this ID does not exist in the system",
         )
+    check_if_match(if_match, make_etag(db_project.version))
 
     # Update the project's attributes
     project_data = project_in.dict(exclude_unset=True)
@@ -139,16 +286,227 @@ def update_project(
     session.add(db_project)
     session.commit()
     session.refresh(db_project)
+    response.headers["ETag"] = make_etag(db_project.version)
     return db_project
 
 
 # Endpoint to retrieve tasks by project ID
-@router.get("/{project_id}/tasks/", response_model=List[TaskPublic])
+@router.get(
+    "/{project_id}/tasks/",
+    dependencies=[require_project_role(ProjectRoleEnum.VIEWER, get_project_role_read)],
+    response_model=List[TaskPublic],
+)
 def get_tasks_by_project_id(
-    *, session: SessionDep, project_id: uuid.UUID
-) -> List[TaskPublic]:
-    project = session.get(Project, project_id)
-    if not project:
+    *,
+    session: ReadSessionDep,
+    project_id: uuid.UUID,
+    response: Response,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
+    if get_project_version(session=session, project_id=project_id) is None:
         raise HTTPException(status_code=404, detail="Project not found")
+    etag = make_etag(*get_project_tasks_version(session=session, project_id=project_id))
+    cached = not_modified(if_none_match, etag, response)
+    if cached:
+        return cached
     tasks = session.exec(select(Task).where(Task.project_id == project_id)).all()
-    return tasks
\ No newline at end of file
+    return tasks
+
+
+@router.post(
+    "/{project_id}/tasks:bulk",
+    dependencies=[require_project_role(ProjectRoleEnum.MANAGER)],
+    response_model=TasksBulkPublic,
+)
+def create_tasks_in_bulk(
+    *,
+    session: SessionDep,
+    project_id: uuid.UUID,
+    tasks_in: List[TaskCreate],
+) -> Any:
+    """Create many tasks in a project at once. Only project owners or managers can do this."""
+    project = get_project_by_id(session=session, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if len(tasks_in) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_MAX_ROWS} tasks can be created at once",
+        )
+
+    tasks, errors = create_tasks_bulk(
+        session=session, project_id=project_id, tasks_in=tasks_in
+    )
+    return TasksBulkPublic(data=tasks, errors=errors)
+
+
+@router.patch(
+    "/{project_id}/tasks:bulk",
+    dependencies=[require_project_role(ProjectRoleEnum.MANAGER)],
+    response_model=TasksPublic,
+)
+def update_tasks_in_bulk(
+    *,
+    session: SessionDep,
+    project_id: uuid.UUID,
+    tasks_in: TasksBulkUpdate,
+) -> Any:
+    """
+    Change the status or assignee of many tasks of a project at once.
+    Only project owners or managers can do this.
+    """
+    project = get_project_by_id(session=session, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if (
+        tasks_in.task_ids is None
+        and not tasks_in.current_status
+        and not tasks_in.current_assigned_member_id
+    ):
+        raise HTTPException(status_code=400, detail="Task ids or a filter are required")
+    if (
+        tasks_in.task_ids is not None
+        and len(tasks_in.task_ids) > settings.BULK_MAX_ROWS
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_MAX_ROWS} tasks can be updated at once",
+        )
+    if (
+        not tasks_in.status
+        and not tasks_in.assigned_member_id
+        and not tasks_in.unassign
+    ):
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    if tasks_in.assigned_member_id and tasks_in.unassign:
+        raise HTTPException(
+            status_code=400, detail="Cannot assign and unassign at once"
+        )
+
+    if tasks_in.assigned_member_id:
+        project_member = session.get(ProjectMember, tasks_in.assigned_member_id)
+        if not project_member:
+            raise HTTPException(status_code=404, detail="Project member not found")
+        if project_member.project_id != project_id:
+            raise HTTPException(
+                status_code=400,
+                detail="Project member does not belong to the same project as the task",
+            )
+
+    tasks = update_tasks_bulk(session=session, project_id=project_id, tasks_in=tasks_in)
+    return TasksPublic(data=tasks, count=len(tasks))
+
+
+# ---- PROJECT EVENTS ----
+@router.get(
+    "/{project_id}/events",
+    dependencies=[require_project_role(ProjectRoleEnum.VIEWER)],
+    response_class=StreamingResponse,
+)
+async def stream_project_events(
+    project_id: uuid.UUID,
+    last_event_id: Annotated[Optional[str], Header()] = None,
+) -> StreamingResponse:
+    """
+    Server-Sent Events for the project's task and comment changes.
+
+    Events are task.created, task.updated, task.deleted and comment.created
+    with the changed object as data. Reconnecting clients send Last-Event-ID
+    and get the events they missed, or a `reset` event when those are no
+    longer known and the project should be reloaded.
+    """
+    if not settings.PROJECT_EVENTS:
+        raise HTTPException(status_code=404, detail="Project events are disabled")
+    return StreamingResponse(
+        event_broker.stream(project_id, last_event_id),
+        media_type="text/event-stream",
+        # Ask proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---- PROJECT EXPORT ----
+EXPORT_COLUMNS = [
+    "type",
+    "id",
+    "name",
+    "description",
+    "owner_id",
+    "user_id",
+    "role",
+    "email",
+    "full_name",
+    "title",
+    "status",
+    "assigned_member_id",
+    "assignee_email",
+    "task_id",
+    "author_id",
+    "author_email",
+    "content",
+    "created_at",
+]
+
+
+def export_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def stream_project_export(
+    project_id: uuid.UUID, export_format: str, bind: Engine
+) -> Iterator[str]:
+    # The request session is closed before the body is streamed, use our own
+    # on the same replica or primary
+    with Session(bind) as session:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        if export_format == "csv":
+            writer.writeheader()
+        records = iter_project_export(session=session, project_id=project_id)
+        for index, record in enumerate(records):
+            record = {key: export_value(value) for key, value in record.items()}
+            if export_format == "csv":
+                writer.writerow(record)
+            else:
+                buffer.write(json.dumps(record) + "\n")
+            # The first record goes out right away, then whole batches
+            if index % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+
+@router.get(
+    "/{project_id}/export",
+    dependencies=[require_project_role(ProjectRoleEnum.OWNER, get_project_role_read)],
+    response_class=StreamingResponse,
+)
+def export_project(
+    session: ReadSessionDep,
+    project_id: uuid.UUID,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """Stream a project with its members, tasks and comments as NDJSON or CSV."""
+    project = get_project_by_id(session=session, project_id=project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # The stream opens its own session on the same engine, the request
+    # sessions are never bound to a connection
+    bind = session.get_bind()
+    assert isinstance(bind, Engine)
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_project_export(project_id, export_format, bind),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="project-{project_id}.{export_format}"'
+        },
+    )
@@ -0,0 +1,33 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.api.deps import ReadCurrentUser, ReadSessionDep
+from app.api.routing import PydanticJSONRoute
+from app.crud import search
+from app.models import SearchResults
+
+router = APIRouter(prefix="/search", tags=["search"], route_class=PydanticJSONRoute)
+
+
+@router.get("/", response_model=SearchResults)
+def search_tasks_and_comments(
+    session: ReadSessionDep,
+    current_user: ReadCurrentUser,
+    q: str = Query(min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+) -> Any:
+    """
+    Search the titles and descriptions of tasks and the content of comments
+    in the caller's projects, best matches first.
+
+    `q` takes web search syntax: quoted phrases, `or` and `-excluded` words.
+    """
+    try:
+        results, next_cursor = search(
+            session=session, q=q, user=current_user, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return SearchResults(data=results, next_cursor=next_cursor)
@@ -1,42 +1,84 @@
 import uuid
-from typing import Any, List, Optional
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import func, select, Session
-from app.api.deps import CurrentUser,get_current_active_superuser, SessionDep
+from datetime import datetime
+from typing import Annotated, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlmodel import select
+from app.api.deps import (
+    CurrentUser,
+    ReadCurrentUser,
+    ReadSessionDep,
+    SessionDep,
+    TaskProjectRole,
+    get_current_active_superuser,
+    get_task_project_role,
+    get_task_project_role_read,
+    has_project_role,
+    require_project_role,
+)
+from app.api.routing import PydanticJSONRoute
+from app.api.etags import check_if_match, make_etag, not_modified
+from app.core.config import settings
 from app.models import (
+    CountStrategyEnum,
+    ProjectEventTypeEnum,
     ProjectMember,
+    ProjectRoleEnum,
     Task,
     TaskPublic,
     TasksPublic,
     TaskCreate,
     TaskUpdate,
-    TaskComment,
+    TaskCommentPublic,
+    TaskCommentsPublic,
 )
 from app.crud import (
+    count_rows,
     create_task,
     get_task_by_id,
-    update_task_status,
     delete_task,
     add_task_comment,
     get_comments_for_task,
+    get_task_comments_version,
     get_project_by_id,
-    list_tasks
+    invalidate_project_cache,
+    list_tasks,
+    publish_task_event,
 )
 
 
-router = APIRouter(prefix="/tasks", tags=["tasks"])
+router = APIRouter(prefix="/tasks", tags=["tasks"], route_class=PydanticJSONRoute)
 
 # ---- TASK ENDPOINTS ----
 @router.get("/", response_model=TasksPublic)
-def read_projects(session: SessionDep, current_user: CurrentUser) -> Any:
+def read_projects(
+    session: ReadSessionDep,
+    current_user: ReadCurrentUser,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: Optional[CountStrategyEnum] = None,
+) -> Any:
     """Retrieve all tasks."""
     
-    count_statement = select(func.count()).select_from(Task)
-    count = session.exec(count_statement).one()
-    return TasksPublic(data=list_tasks(session=session), count=count)
+    count, count_strategy = count_rows(
+        session=session, statement=select(Task), strategy=count_strategy
+    )
+    try:
+        tasks, next_cursor = list_tasks(
+            session=session, cursor=cursor, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TasksPublic(
+        data=tasks, count=count, count_strategy=count_strategy, next_cursor=next_cursor
+    )
 
 
-@router.post("/{project_id}", response_model=TaskPublic)
+@router.post(
+    "/{project_id}",
+    dependencies=[require_project_role(ProjectRoleEnum.MANAGER)],
+    response_model=TaskPublic,
+)
 def create_new_task(session: SessionDep, current_user: CurrentUser, project_id: uuid.UUID, task_in: TaskCreate) -> Any:
     """Create a task in a project. Only project owners or managers can create tasks."""
     project = get_project_by_id(session=session, project_id=project_id)
@@ -47,26 +89,51 @@ def create_new_task(session: SessionDep, current_user: CurrentUser, project_id:
 
 
 @router.put("/{task_id}", response_model=TaskPublic)
-def update_task(session: SessionDep, current_user: CurrentUser, task_id: uuid.UUID, task_in: TaskUpdate) -> Any:
+def update_task(
+    session: SessionDep,
+    current_user: CurrentUser,
+    role: TaskProjectRole,
+    task_id: uuid.UUID,
+    task_in: TaskUpdate,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
     """Update task details. Only project managers or assigned users can update."""
-    task = get_task_by_id(session=session, task_id=task_id)
+    task = get_task_by_id(
+        session=session, task_id=task_id, for_update=if_match is not None
+    )
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    check_if_match(if_match, make_etag(task.version))
 
-    if task.assigned_member_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if not has_project_role(role, ProjectRoleEnum.MANAGER):
+        assignee = task.assigned_member_id and session.get(
+            ProjectMember, task.assigned_member_id
+        )
+        if not assignee or assignee.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
 
     task.title = task_in.title or task.title
     task.description = task_in.description or task.description
     task.status = task_in.status or task.status
     session.add(task)
+    publish_task_event(
+        session=session, event_type=ProjectEventTypeEnum.TASK_UPDATED, task=task
+    )
     session.commit()
     session.refresh(task)
+    invalidate_project_cache(task.project_id)
+    response.headers["ETag"] = make_etag(task.version)
     return task
 
 
-@router.delete("/{task_id}")
-def remove_task(session: SessionDep, current_user: CurrentUser, task_id: uuid.UUID) -> Any:
+@router.delete(
+    "/{task_id}",
+    dependencies=[require_project_role(ProjectRoleEnum.MANAGER, get_task_project_role)],
+)
+def remove_task(
+    session: SessionDep, current_user: CurrentUser, task_id: uuid.UUID
+) -> Any:
     """Delete a task. Only the project owner or managers can delete tasks."""
     task = get_task_by_id(session=session, task_id=task_id)
     if not task:
@@ -75,16 +142,26 @@ def remove_task(session: SessionDep, current_user: CurrentUser, task_id: uuid.UU
     delete_task(session=session, task_id=task_id)
     return {"message": "Task deleted successfully"}
 
-@router.patch("/{task_id}/assign", response_model=Task)
+
+@router.patch(
+    "/{task_id}/assign",
+    dependencies=[require_project_role(ProjectRoleEnum.MANAGER, get_task_project_role)],
+    response_model=Task,
+)
 def assign_task(
     *,
     session: SessionDep,
     task_id: uuid.UUID,
-    assigned_member_id: uuid.UUID
+    assigned_member_id: uuid.UUID,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ) -> Task:
-    task = session.get(Task, task_id)
+    task = get_task_by_id(
+        session=session, task_id=task_id, for_update=if_match is not None
+    )
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    check_if_match(if_match, make_etag(task.version))
 
     project_member = session.get(ProjectMember, assigned_member_id)
     if not project_member:
@@ -95,45 +172,114 @@ def assign_task(
 
     task.assigned_member_id = assigned_member_id
     session.add(task)
+    publish_task_event(
+        session=session, event_type=ProjectEventTypeEnum.TASK_UPDATED, task=task
+    )
     session.commit()
     session.refresh(task)
+    invalidate_project_cache(task.project_id)
+    response.headers["ETag"] = make_etag(task.version)
     return task
 
-@router.patch("/{task_id}/unassign", response_model=Task)
+
+@router.patch(
+    "/{task_id}/unassign",
+    dependencies=[require_project_role(ProjectRoleEnum.MANAGER, get_task_project_role)],
+    response_model=Task,
+)
 def unassign_task(
     *,
     session: SessionDep,
-    task_id: uuid.UUID
+    task_id: uuid.UUID,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ) -> Task:
-    task = session.get(Task, task_id)
+    task = get_task_by_id(
+        session=session, task_id=task_id, for_update=if_match is not None
+    )
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    check_if_match(if_match, make_etag(task.version))
 
     task.assigned_member_id = None
     session.add(task)
+    publish_task_event(
+        session=session, event_type=ProjectEventTypeEnum.TASK_UPDATED, task=task
+    )
     session.commit()
     session.refresh(task)
+    invalidate_project_cache(task.project_id)
+    response.headers["ETag"] = make_etag(task.version)
     return task
 
+
 # ---- TASK COMMENTS ENDPOINTS ----
-@router.post("/{task_id}/comments", response_model=TaskComment)
-def add_comment(session: SessionDep, current_user: CurrentUser, task_id: uuid.UUID, content: str) -> Any:
+@router.post(
+    "/{task_id}/comments",
+    dependencies=[require_project_role(ProjectRoleEnum.VIEWER, get_task_project_role)],
+    response_model=TaskCommentPublic,
+)
+def add_comment(
+    session: SessionDep, current_user: CurrentUser, task_id: uuid.UUID, content: str
+) -> Any:
     """Add a comment to a task. Any user in the project can comment."""
     task = get_task_by_id(session=session, task_id=task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return add_task_comment(session=session, task_id=task_id, author_id=current_user.id, content=content)
+    project_id = task.project_id
+    comment = add_task_comment(
+        session=session, task_id=task_id, author_id=current_user.id, content=content
+    )
+    invalidate_project_cache(project_id)
+    return comment
 
 
-@router.get("/{task_id}/comments", response_model=List[TaskComment])
-def get_task_comments(session: SessionDep, current_user: CurrentUser, task_id: uuid.UUID) -> Any:
-    """Retrieve all comments for a task."""
-    task = get_task_by_id(session=session, task_id=task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+@router.get(
+    "/{task_id}/comments",
+    dependencies=[
+        require_project_role(ProjectRoleEnum.VIEWER, get_task_project_role_read)
+    ],
+    response_model=TaskCommentsPublic,
+)
+def get_task_comments(
+    session: ReadSessionDep,
+    current_user: ReadCurrentUser,
+    task_id: uuid.UUID,
+    response: Response,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Any:
+    """Retrieve a task's comments, oldest first, a page at a time."""
+    if after and before:
+        raise HTTPException(
+            status_code=400, detail="Use either after or before, not both"
+        )
+    # The role check already 404s for a missing task. A page only changes
+    # when the task's comments do, whatever the cursor
+    etag = make_etag(*get_task_comments_version(session=session, task_id=task_id))
+    cached = not_modified(if_none_match, etag, response)
+    if cached:
+        return cached
+
+    try:
+        comments, next_cursor, prev_cursor = get_comments_for_task(
+            session=session,
+            task_id=task_id,
+            after=after,
+            before=before,
+            since=since,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TaskCommentsPublic(
+        data=comments, next_cursor=next_cursor, prev_cursor=prev_cursor
+    )
 
-    return get_comments_for_task(session=session, task_id=task_id)
 
 @router.patch(
     "/{task_id}",
@@ -145,24 +291,34 @@ def update_task(
     session: SessionDep,
     task_id: uuid.UUID,
     task_in: TaskUpdate,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ) -> Any:
-    """db_task
-    Update a project.
     """
-    # Retrieve the existing project
-    db_task = session.get(Task, task_id)
+    Update a task.
+    """
+    # Retrieve the existing task, locked when If-Match is checked
+    db_task = get_task_by_id(
+        session=session, task_id=task_id, for_update=if_match is not None
+    )
     if not db_task:
         raise HTTPException(
             status_code=404,
             detail="The task with this ID does not exist in the system",
         )
+    check_if_match(if_match, make_etag(db_task.version))
 
-    # Update the project's attributes
+    # Update the task's attributes
     task_data = task_in.dict(exclude_unset=True)
     for key, value in task_data.items():
         setattr(db_task, key, value)
 
     session.add(db_task)
+    publish_task_event(
+        session=session, event_type=ProjectEventTypeEnum.TASK_UPDATED, task=db_task
+    )
     session.commit()
     session.refresh(db_task)
+    invalidate_project_cache(db_task.project_id)
+    response.headers["ETag"] = make_etag(db_task.version)
     return db_task
@@ -1,8 +1,9 @@
+import io
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from sqlmodel import col, delete, select
 
 from app import crud
 from app.api.deps import (
@@ -10,23 +11,28 @@ from app.api.deps import (
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.routing import PydanticJSONRoute
+from app.core.cache import current_user_cache
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
+from app.import_users import import_users
 from app.models import (
+    CountStrategyEnum,
     Item,
     Message,
     UpdatePassword,
     User,
     UserCreate,
+    UserImportResult,
     UserPublic,
     UserRegister,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=PydanticJSONRoute)
 
 
 @router.get(
@@ -34,18 +40,36 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    cursor: str | None = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.LIST_MAX_LIMIT),
+    count_strategy: CountStrategyEnum | None = None,
+) -> Any:
     """
     Retrieve users.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    count, count_strategy = crud.count_rows(
+        session=session, statement=select(User), strategy=count_strategy
+    )
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    try:
+        users, next_cursor = crud.paginate(
+            session=session,
+            statement=select(User),
+            keys=[col(User.id)],
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return UsersPublic(data=users, count=count)
+    return UsersPublic(
+        data=users, count=count, count_strategy=count_strategy, next_cursor=next_cursor
+    )
 
 
 @router.post(
@@ -67,7 +91,8 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        crud.enqueue_email(
+            session=session,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -75,6 +100,24 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     return user
 
 
+@router.post(
+    "/import",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserImportResult,
+)
+def import_users_csv(session: SessionDep, file: UploadFile) -> Any:
+    """
+    Create users from a CSV file with an email,full_name,password,project,role header.
+    """
+    csv_file = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return import_users(
+            session=session, csv_file=csv_file, max_rows=settings.BULK_MAX_ROWS
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.patch("/me", response_model=UserPublic)
 def update_user_me(
     *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
@@ -93,6 +136,7 @@ def update_user_me(
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
     session.commit()
+    current_user_cache.invalidate(str(current_user.id))
     session.refresh(current_user)
     return current_user
 
@@ -114,6 +158,7 @@ def update_password_me(
     current_user.hashed_password = hashed_password
     session.add(current_user)
     session.commit()
+    current_user_cache.invalidate(str(current_user.id))
     return Message(message="Password updated successfully")
 
 
@@ -136,6 +181,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         )
     session.delete(current_user)
     session.commit()
+    current_user_cache.invalidate(str(current_user.id))
     return Message(message="User deleted successfully")
 
 
@@ -223,4 +269,5 @@ def delete_user(
     session.exec(statement)  # type: ignore
     session.delete(user)
     session.commit()
+    current_user_cache.invalidate(str(user_id))
     return Message(message="User deleted successfully")
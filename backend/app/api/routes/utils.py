@@ -1,11 +1,20 @@
+import os
+from dataclasses import asdict
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
-from app.models import Message
-from app.utils import generate_test_email, send_email
+from app import crud
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.api.routing import PydanticJSONRoute
+from app.core.cache import caches
+from app.core.db import async_engine, engine, pool_status, replicas
+from app.core.security import password_hasher
+from app.email_outbox import outbox_worker
+from app.models import CacheStats, EmailOutboxStats, HashingStats, Message, PoolStatus
+from app.utils import generate_test_email
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=PydanticJSONRoute)
 
 
 @router.post(
@@ -13,12 +22,13 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(session: SessionDep, email_to: EmailStr) -> Message:
     """
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    crud.enqueue_email(
+        session=session,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -26,6 +36,67 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/db-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=list[PoolStatus],
+)
+def read_db_pool() -> list[PoolStatus]:
+    """
+    Connection pool usage of the worker process serving this request, and
+    the health of its read replicas.
+    """
+    statuses = [
+        pool_status(engine.pool, "sync"),
+        pool_status(async_engine.sync_engine.pool, "async"),
+    ]
+    for index, replica in enumerate(replicas.replicas):
+        status = pool_status(replica.engine.pool, f"replica-{index}")
+        status.healthy = replica.healthy
+        status.lag_seconds = replica.lag_seconds
+        statuses.append(status)
+    return statuses
+
+
+@router.get(
+    "/password-hashing/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=list[HashingStats],
+)
+def read_password_hashing() -> list[HashingStats]:
+    """
+    Password hashing latency of the worker process serving this request.
+    """
+    return [
+        HashingStats(operation=operation, pid=os.getpid(), **asdict(stats))
+        for operation, stats in password_hasher.stats().items()
+    ]
+
+
+@router.get(
+    "/caches/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=list[CacheStats],
+)
+def read_caches() -> list[CacheStats]:
+    """
+    Hit and miss counters of the in-process caches of the worker serving this request.
+    """
+    return [cache.stats() for cache in caches.values()]
+
+
+@router.get(
+    "/email-outbox/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=EmailOutboxStats,
+)
+def read_email_outbox(session: SessionDep) -> EmailOutboxStats:
+    """
+    Outbox queue depth, plus the send counters of this worker process's outbox worker.
+    """
+    return outbox_worker.stats(session=session)
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
@@ -0,0 +1,126 @@
+import functools
+import inspect
+import json
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+
+# Given to endpoints that take no Response of their own, so that headers and
+# cookies set by their dependencies are kept
+RESPONSE_PARAM = "_pydantic_json_route_response"
+
+
+def has_floats(adapter: TypeAdapter[Any]) -> bool:
+    # The stdlib and pydantic-core format some floats differently (1e-05 vs 1e-5)
+    return '"number"' in json.dumps(adapter.json_schema())
+
+
+def takes_response(parameter: inspect.Parameter) -> bool:
+    return isinstance(parameter.annotation, type) and issubclass(
+        parameter.annotation, Response
+    )
+
+
+class PydanticJSONRoute(APIRoute):
+    """
+    Route that validates the endpoint's return value against `response_model`
+    once and writes it straight to JSON bytes with pydantic-core.
+
+    The default FastAPI path dumps the validated model to Python objects and
+    then encodes them again with the stdlib json module. The output is the
+    same bytes, compact and not ASCII-escaped. Routes whose schema has floats
+    or that set response_model_include/exclude options keep the default path.
+    Headers and the status code set on an injected `Response`, by the
+    endpoint or its dependencies, are kept, and endpoints that return a
+    `Response` themselves are passed through.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        adapter = self.json_adapter(kwargs)
+        if adapter is not None:
+            # Wrapped before FastAPI reads the endpoint's signature, so the
+            # route is built through its public constructor only
+            endpoint = self.wrap_endpoint(endpoint, adapter)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def json_adapter(options: dict[str, Any]) -> TypeAdapter[Any] | None:
+        """Adapter of the route's response model, None if it keeps the default path."""
+        response_model = options.get("response_model")
+        if (
+            response_model is None
+            # Left for FastAPI to infer from the return annotation
+            or isinstance(response_model, DefaultPlaceholder)
+            or options.get("response_model_include") is not None
+            or options.get("response_model_exclude") is not None
+            or options.get("response_model_exclude_unset")
+            or options.get("response_model_exclude_defaults")
+            or options.get("response_model_exclude_none")
+        ):
+            return None
+        adapter: TypeAdapter[Any] = TypeAdapter(response_model)
+        if has_floats(adapter):
+            return None
+        return adapter
+
+    def wrap_endpoint(
+        self, call: Callable[..., Any], adapter: TypeAdapter[Any]
+    ) -> Callable[..., Any]:
+        def render(
+            content: Any, values: dict[str, Any], hidden: Response | None
+        ) -> Any:
+            if isinstance(content, Response):
+                return content
+            try:
+                value = adapter.validate_python(content, from_attributes=True)
+            except ValidationError as e:
+                raise ResponseValidationError(errors=e.errors(), body=content)
+            response = Response(
+                content=adapter.dump_json(value, by_alias=self.response_model_by_alias),
+                status_code=self.status_code or 200,
+                media_type="application/json",
+            )
+            for sub_response in [*values.values(), hidden]:
+                if isinstance(sub_response, Response):
+                    if sub_response.status_code:
+                        response.status_code = sub_response.status_code
+                    response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        # Same sync/async flavour as the endpoint, so sync endpoints still
+        # serialize in the threadpool
+        wrapper: Callable[..., Any]
+        if inspect.iscoroutinefunction(call):
+
+            @functools.wraps(call)
+            async def async_endpoint(**values: Any) -> Any:
+                hidden = values.pop(RESPONSE_PARAM, None)
+                return render(await call(**values), values, hidden)
+
+            wrapper = async_endpoint
+        else:
+
+            @functools.wraps(call)
+            def endpoint(**values: Any) -> Any:
+                hidden = values.pop(RESPONSE_PARAM, None)
+                return render(call(**values), values, hidden)
+
+            wrapper = endpoint
+
+        # FastAPI reads the parameters from __signature__, plus a Response
+        # for endpoints that take none of their own
+        signature = inspect.signature(call)
+        parameters = list(signature.parameters.values())
+        if not any(takes_response(parameter) for parameter in parameters):
+            parameters.append(
+                inspect.Parameter(
+                    RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response
+                )
+            )
+        wrapper.__signature__ = signature.replace(parameters=parameters)  # type: ignore[union-attr]
+        return wrapper
@@ -0,0 +1,208 @@
+"""
+Async counterparts of the app.crud helpers used by the async routes.
+
+Statements are built exactly as in app.crud, only execution differs.
+"""
+
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Optional, TypeVar
+
+from sqlalchemy import orm
+from sqlalchemy.orm import Mapped
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app import crud
+from app.core.config import settings
+from app.crud import (
+    comment_event,
+    comments_page,
+    comments_statement,
+    keyset_page,
+    keyset_statement,
+    project_events_statement,
+    project_tasks_version_statement,
+    project_version_statement,
+    task_comments_version_statement,
+)
+from app.models import (
+    CountStrategyEnum,
+    Project,
+    ProjectDetailPublic,
+    ProjectRoleEnum,
+    Task,
+    TaskComment,
+    User,
+)
+
+T = TypeVar("T")
+
+
+async def paginate(
+    *,
+    session: AsyncSession,
+    statement: SelectOfScalar[T],
+    keys: Sequence[Mapped[Any]],
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> tuple[Sequence[T], Optional[str]]:
+    statement = keyset_statement(statement, keys, cursor=cursor, skip=skip, limit=limit)
+    rows = (await session.exec(statement)).all()
+    return keyset_page(rows, keys, limit)
+
+
+def as_sqlmodel(sync_session: orm.Session) -> Session:
+    # run_sync() is typed with SQLAlchemy's Session, sqlmodel's AsyncSession
+    # hands its sync_session_class, a sqlmodel Session
+    assert isinstance(sync_session, Session)
+    return sync_session
+
+
+async def count_rows(
+    *,
+    session: AsyncSession,
+    statement: SelectOfScalar[Any],
+    strategy: Optional[CountStrategyEnum] = None,
+) -> tuple[Optional[int], CountStrategyEnum]:
+    return await session.run_sync(
+        lambda sync_session: crud.count_rows(
+            session=as_sqlmodel(sync_session), statement=statement, strategy=strategy
+        )
+    )
+
+
+async def get_user_by_email(*, session: AsyncSession, email: str) -> User | None:
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
+
+# ---- PROJECT CRUD ----
+async def get_project_by_id(
+    *, session: AsyncSession, project_id: uuid.UUID
+) -> Optional[Project]:
+    return await session.get(Project, project_id)
+
+
+async def get_project_version(
+    *, session: AsyncSession, project_id: uuid.UUID
+) -> Optional[int]:
+    return (await session.exec(project_version_statement(project_id))).first()
+
+
+async def get_project_tasks_version(
+    *, session: AsyncSession, project_id: uuid.UUID
+) -> tuple[Any, ...]:
+    return tuple(
+        (await session.exec(project_tasks_version_statement(project_id))).one()
+    )
+
+
+async def get_project_role(
+    *, session: AsyncSession, project_id: uuid.UUID, user_id: uuid.UUID
+) -> Optional[ProjectRoleEnum]:
+    return await session.run_sync(
+        lambda sync_session: crud.get_project_role(
+            session=as_sqlmodel(sync_session), project_id=project_id, user_id=user_id
+        )
+    )
+
+
+async def get_project_detail(
+    *, session: AsyncSession, project_id: uuid.UUID, include: set[str]
+) -> Optional[ProjectDetailPublic]:
+    return await session.run_sync(
+        lambda sync_session: crud.get_project_detail(
+            session=as_sqlmodel(sync_session), project_id=project_id, include=include
+        )
+    )
+
+
+async def list_projects(
+    *,
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> tuple[Sequence[Project], Optional[str]]:
+    return await paginate(
+        session=session,
+        statement=select(Project),
+        keys=[col(Project.id)],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+
+
+# ---- TASK CRUD ----
+async def list_tasks(
+    *,
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> tuple[Sequence[Task], Optional[str]]:
+    return await paginate(
+        session=session,
+        statement=select(Task),
+        keys=[col(Task.id)],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+
+
+async def get_task_by_id(
+    *, session: AsyncSession, task_id: uuid.UUID
+) -> Optional[Task]:
+    return await session.get(Task, task_id)
+
+
+# ---- TASK COMMENT CRUD ----
+async def add_task_comment(
+    *, session: AsyncSession, task_id: uuid.UUID, author_id: uuid.UUID, content: str
+) -> TaskComment:
+    author = await session.get(User, author_id)
+    if not author:
+        raise ValueError("Author does not exist.")
+    task = await session.get(Task, task_id)
+    if not task:
+        raise ValueError("Task does not exist.")
+
+    db_comment = TaskComment(task_id=task_id, author_id=author_id, content=content)
+    session.add(db_comment)
+    if settings.PROJECT_EVENTS:
+        await session.flush()
+        await session.refresh(db_comment)
+        await session.exec(
+            project_events_statement([comment_event(db_comment, task.project_id)])
+        )
+    await session.commit()
+    await session.refresh(db_comment)
+    return db_comment
+
+
+async def get_task_comments_version(
+    *, session: AsyncSession, task_id: uuid.UUID
+) -> tuple[Any, ...]:
+    return tuple((await session.exec(task_comments_version_statement(task_id))).one())
+
+
+async def get_comments_for_task(
+    *,
+    session: AsyncSession,
+    task_id: uuid.UUID,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+) -> tuple[Sequence[TaskComment], Optional[str], Optional[str]]:
+    statement = comments_statement(
+        task_id=task_id, after=after, before=before, since=since, limit=limit
+    )
+    rows = (await session.exec(statement)).all()
+    return comments_page(rows, after=after, before=before, limit=limit)
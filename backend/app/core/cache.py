@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Generic, TypeVar
+
+from app.core.config import settings
+from app.models import CacheStats, ProjectRoleEnum, ProjectSummary
+
+V = TypeVar("V")
+
+# Every cache created in this process, by name, for the stats endpoint
+caches: dict[str, "TTLCache[Any]"] = {}
+
+
+class TTLCache(Generic[V]):
+    """
+    Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Each server worker has its own copy, so invalidation only reaches the
+    worker it runs in and `ttl` bounds how stale the other workers can be.
+    A `ttl` of 0 disables the cache.
+    """
+
+    def __init__(self, name: str, *, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, key: Hashable) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: V) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            name=self.name,
+            size=len(self._data),
+            maxsize=self.maxsize,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+        )
+
+
+# User id -> column snapshot of the User, read by get_current_user
+current_user_cache: TTLCache[dict[str, Any]] = TTLCache(
+    "current_user",
+    maxsize=settings.CURRENT_USER_CACHE_SIZE,
+    ttl=settings.CURRENT_USER_CACHE_TTL,
+)
+
+# Project id -> ProjectSummary, dropped by every task, comment and member write
+project_summary_cache: TTLCache[ProjectSummary] = TTLCache(
+    "project_summary",
+    maxsize=settings.PROJECT_SUMMARY_CACHE_SIZE,
+    ttl=settings.PROJECT_SUMMARY_CACHE_TTL,
+)
+
+# Compiled count statement and parameters -> exact row count
+count_cache: TTLCache[int] = TTLCache(
+    "count",
+    maxsize=settings.COUNT_CACHE_SIZE,
+    ttl=settings.COUNT_CACHE_TTL,
+)
+
+# (project id, user id) -> (role,), where the role is None for non-members.
+# Dropped by membership writes in this worker, the user import is only
+# bounded by the TTL
+project_role_cache: TTLCache[tuple[ProjectRoleEnum | None]] = TTLCache(
+    "project_role",
+    maxsize=settings.PROJECT_ROLE_CACHE_SIZE,
+    ttl=settings.PROJECT_ROLE_CACHE_TTL,
+)
+
+# Authorization header -> True, for clients that wrote in the last few
+# seconds and must read from the primary. Browsers also get a cookie, which
+# covers the other workers.
+primary_pin_cache: TTLCache[bool] = TTLCache(
+    "primary_pin",
+    maxsize=10_000,
+    ttl=settings.DB_PRIMARY_PIN_SECONDS,
+)
@@ -69,6 +69,96 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Largest list accepted by the bulk endpoints in one request
+    BULK_MAX_ROWS: int = 1000
+
+    # Largest page the list endpoints return
+    LIST_MAX_LIMIT: int = 1000
+
+    # Connection pool, per engine and per worker process. With DB_NULL_POOL
+    # every checkout opens a fresh connection, meant for running behind pgbouncer.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_NULL_POOL: bool = False
+
+    # Read replicas, as comma-separated postgresql+psycopg URLs. Read-only
+    # routes take them in turn, skipping any that is unreachable or lags more
+    # than DB_REPLICA_MAX_LAG seconds, rechecked every DB_REPLICA_CHECK_INTERVAL
+    # seconds. Clients that wrote stay on the primary for DB_PRIMARY_PIN_SECONDS.
+    DB_REPLICA_URIS: Annotated[
+        list[PostgresDsn] | str, BeforeValidator(parse_cors)
+    ] = []
+    DB_REPLICA_MAX_LAG: float = 10
+    DB_REPLICA_CHECK_INTERVAL: float = 5
+    DB_REPLICA_CONNECT_TIMEOUT: int = 2
+    DB_PRIMARY_PIN_SECONDS: float = 5
+
+    # Count the SQL statements of each request and their time, sent back in
+    # the X-DB-Queries and Server-Timing headers. A statement run at least
+    # DB_N_PLUS_ONE_THRESHOLD times in one request is logged as a probable
+    # N+1 query, 0 disables the warning. On by default in the local
+    # environment only, the headers tell every client about the database.
+    DB_QUERY_STATS: bool | None = None
+    DB_N_PLUS_ONE_THRESHOLD: int = 3
+
+    # Serve the ported routes from async handlers on an asyncio engine
+    # (psycopg's async driver) instead of sync handlers in the thread pool.
+    # Only the hot paths are ported: the items routes, the user, project and
+    # task lists and reads, /users/me, a project's tasks and task comments.
+    # Every other route, including the other writes, stays sync. The async
+    # reads use the DB_REPLICA_URIS replicas like their sync twins.
+    DB_ASYNC: bool = False
+
+    # Authenticated users are cached per worker for this many seconds, 0 disables
+    CURRENT_USER_CACHE_SIZE: int = 1024
+    CURRENT_USER_CACHE_TTL: float = 30
+
+    # How list endpoints fill in `count` when the request does not say.
+    # Exact counts are cached per filter for COUNT_CACHE_TTL seconds, 0 disables
+    LIST_COUNT_STRATEGY: Literal["exact", "estimated", "none"] = "exact"
+    COUNT_CACHE_SIZE: int = 1024
+    COUNT_CACHE_TTL: float = 0
+
+    # Project summaries are cached per worker for this many seconds, 0 disables
+    PROJECT_SUMMARY_CACHE_SIZE: int = 1024
+    PROJECT_SUMMARY_CACHE_TTL: float = 0
+
+    # Project roles of users are cached per worker for this many seconds, 0 disables
+    PROJECT_ROLE_CACHE_SIZE: int = 4096
+    PROJECT_ROLE_CACHE_TTL: float = 0
+
+    # Task and comment writes NOTIFY their project's event stream. Each server
+    # worker keeps the last BUFFER_SIZE events for clients that reconnect,
+    # and drops a stream that falls QUEUE_SIZE events behind.
+    PROJECT_EVENTS: bool = True
+    PROJECT_EVENTS_BUFFER_SIZE: int = 10_000
+    PROJECT_EVENTS_QUEUE_SIZE: int = 1000
+    PROJECT_EVENTS_KEEPALIVE: float = 15
+
+    # Request latency, size and status metrics, served at /metrics in the
+    # Prometheus text format, behind METRICS_TOKEN as a bearer token. On by
+    # default in the local environment, or when a token is set. Outside the
+    # local environment they are only served behind a token.
+    # With several server workers, point METRICS_DIR at a directory that is
+    # emptied on startup, each worker writes its metrics there every
+    # FLUSH_INTERVAL seconds and a scrape of any worker sums them all.
+    METRICS_ENABLED: bool | None = None
+    METRICS_TOKEN: str | None = None
+    METRICS_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL: float = 1
+
+    # bcrypt runs in this many worker processes per server worker, 0 hashes
+    # inline. Up to MAX_WAITING callers beyond MAX_PENDING wait up to
+    # QUEUE_TIMEOUT seconds, the rest get a 503. Each caller holds one of the
+    # 40 threads sync routes run on, keep the sum of the two well below that.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 8
+    PASSWORD_HASH_MAX_WAITING: int = 8
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 10
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -78,6 +168,29 @@ class Settings(BaseSettings):
     EMAILS_FROM_EMAIL: EmailStr | None = None
     EMAILS_FROM_NAME: EmailStr | None = None
 
+    @model_validator(mode="after")
+    def _set_default_query_stats(self) -> Self:
+        if self.DB_QUERY_STATS is None:
+            self.DB_QUERY_STATS = self.ENVIRONMENT == "local"
+        return self
+
+    @model_validator(mode="after")
+    def _check_metrics_token(self) -> Self:
+        if self.METRICS_ENABLED is None:
+            self.METRICS_ENABLED = (
+                self.ENVIRONMENT == "local" or self.METRICS_TOKEN is not None
+            )
+        if (
+            self.METRICS_ENABLED
+            and not self.METRICS_TOKEN
+            and self.ENVIRONMENT != "local"
+        ):
+            raise ValueError(
+                "METRICS_TOKEN must be set to serve /metrics outside the local "
+                "environment, or METRICS_ENABLED set to false."
+            )
+        return self
+
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
         if not self.EMAILS_FROM_NAME:
@@ -86,6 +199,19 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Routes only queue emails, a worker thread in each server process sends
+    # them over one reused SMTP connection, closed after IDLE_TIMEOUT seconds
+    # without mail. Failed sends are retried after RETRY_BACKOFF * 2**n
+    # seconds, up to MAX_ATTEMPTS times. Claimed emails are held for LEASE
+    # seconds while they are sent, other workers retry them after that.
+    EMAIL_OUTBOX_WORKER: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 1
+    EMAIL_OUTBOX_IDLE_TIMEOUT: float = 30
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_RETRY_BACKOFF: float = 30
+    EMAIL_OUTBOX_LEASE: float = 300
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
@@ -1,10 +1,348 @@
+import itertools
+import logging
+import os
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Engine, event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
 from sqlmodel import Session, create_engine, select
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app import crud
 from app.core.config import settings
-from app.models import User, UserCreate
+from app.models import PoolStatus, User, UserCreate
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def record(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _TimedGetMixin:
+    """Time how long checkouts wait on the pool and count the ones that time out."""
+
+    wait_stats: PoolWaitStats
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedGetMixin, QueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+
+class TimedAsyncQueuePool(_TimedGetMixin, AsyncAdaptedQueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+
+def engine_options(*, is_async: bool = False) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if settings.DB_NULL_POOL:
+        options["poolclass"] = NullPool
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+@dataclass
+class QueryStats:
+    """Statements a request ran, and how many times it ran each one."""
+
+    count: int = 0
+    seconds: float = 0.0
+    statements: dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Statements run at least `threshold` times, probably once per row of a loop."""
+        return {s: n for s, n in self.statements.items() if n >= threshold}
+
+
+# Stats of the request being served. Sync endpoints and dependencies run in
+# the thread pool and async sessions in greenlets, both on a copy of the
+# request's context that shares this object.
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+# Called with the stats of every finished request, the tests watch the
+# queries of their requests through this
+query_stats_observers: list[Callable[[Scope, QueryStats], None]] = []
+
+
+def _before_cursor_execute(conn: Any, *_args: Any) -> None:
+    if current_query_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+    stats = current_query_stats.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(context: Any) -> None:
+    started = (
+        context.connection.info.get("query_started") if context.connection else None
+    )
+    if started:
+        started.pop()
+
+
+def instrument(db_engine: Engine) -> Engine:
+    """Count the statements `db_engine` runs and their time in current_query_stats."""
+    if settings.DB_QUERY_STATS:
+        event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(db_engine, "handle_error", _handle_error)
+    return db_engine
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that counts the SQL statements of each HTTP request.
+
+    The count and database time so far are sent in the `X-DB-Queries` and
+    `Server-Timing` response headers, which for streamed responses leaves
+    out the statements run while streaming. When the request is done the
+    totals are logged at debug level, and every statement run at least
+    `repeat_threshold` times is logged as a probable N+1 query.
+    """
+
+    def __init__(self, app: ASGIApp, *, repeat_threshold: int) -> None:
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(stats.count))
+                headers.append("Server-Timing", f"db;dur={stats.seconds * 1000:.1f}")
+            await send(message)
+
+        token = current_query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            self.report(scope, stats)
+
+    def report(self, scope: Scope, stats: QueryStats) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        logger.debug(
+            f"{request}: {stats.count} queries, {stats.seconds * 1000:.1f} ms in the database"
+        )
+        if self.repeat_threshold:
+            for statement, times in stats.repeated(self.repeat_threshold).items():
+                logger.warning(
+                    f"Probable N+1 query in {request}, ran {times} times: {statement}"
+                )
+        for observer in query_stats_observers:
+            observer(scope, stats)
+
+
+engine = instrument(
+    create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **engine_options())
+)
+# The postgresql+psycopg URL resolves to psycopg's async driver here
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **engine_options(is_async=True)
+)
+instrument(async_engine.sync_engine)
+
+
+# Seconds of WAL the server has received but not replayed yet. A standby
+# that replayed everything is current however old its last transaction is,
+# and a server that is not a standby is never behind.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+@dataclass
+class Replica:
+    engine: Engine
+    # The same server for the async routes, checked through `engine`
+    async_engine: AsyncEngine | None = None
+    healthy: bool = True
+    lag_seconds: float | None = None
+    checked_at: float = float("-inf")
+
+
+class ReplicaSet:
+    """
+    Read replicas handed out in turn.
+
+    A replica is checked by the request that picks it once `check_interval`
+    seconds have passed since its last check, and skipped while it can't be
+    reached or lags more than `max_lag` seconds. A replica whose connection
+    drops mid-request is skipped until its next check.
+    """
+
+    def __init__(
+        self,
+        engines: list[Engine],
+        *,
+        async_engines: list[AsyncEngine] | None = None,
+        check_interval: float,
+        max_lag: float,
+    ) -> None:
+        self.replicas = [
+            Replica(engine, async_engine)
+            for engine, async_engine in itertools.zip_longest(
+                engines, async_engines or []
+            )
+        ]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+            if replica.async_engine is not None:
+                event.listen(
+                    replica.async_engine.sync_engine,
+                    "handle_error",
+                    self._on_error(replica),
+                )
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _on_error(self, replica: Replica) -> Any:
+        def handle_error(context: Any) -> None:
+            if context.is_disconnect:
+                replica.healthy = False
+
+        return handle_error
+
+    def check(self, replica: Replica) -> None:
+        replica.checked_at = time.monotonic()
+        try:
+            with replica.engine.connect() as connection:
+                lag = connection.execute(REPLICA_LAG_QUERY).scalar_one()
+        except exc.SQLAlchemyError as e:
+            replica.healthy, replica.lag_seconds = False, None
+            logger.warning(f"Read replica {replica.engine.url!r} is unreachable: {e}")
+            return
+        replica.lag_seconds = float(lag or 0)
+        replica.healthy = replica.lag_seconds <= self.max_lag
+        if not replica.healthy:
+            logger.warning(
+                f"Read replica {replica.engine.url!r} is {replica.lag_seconds:.1f}s behind"
+            )
+
+    def _next_healthy(self) -> Replica | None:
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._turn) % len(self.replicas)]
+            if time.monotonic() - replica.checked_at >= self.check_interval:
+                self.check(replica)
+            if replica.healthy:
+                return replica
+        return None
+
+    def choose(self) -> Engine | None:
+        """The next healthy replica, or None to read from the primary."""
+        replica = self._next_healthy()
+        return replica.engine if replica else None
+
+    def choose_async(self) -> AsyncEngine | None:
+        """
+        Async engine of the next healthy replica, or None to read from the
+        primary. A due check connects synchronously, so call it off the
+        event loop.
+        """
+        replica = self._next_healthy()
+        return replica.async_engine if replica else None
+
+
+replica_connect_args = {"connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT}
+replicas = ReplicaSet(
+    [
+        instrument(
+            create_engine(
+                str(uri), connect_args=replica_connect_args, **engine_options()
+            )
+        )
+        for uri in settings.DB_REPLICA_URIS
+    ],
+    async_engines=[
+        create_async_engine(
+            str(uri),
+            connect_args=replica_connect_args,
+            **engine_options(is_async=True),
+        )
+        for uri in settings.DB_REPLICA_URIS
+    ],
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+)
+for replica in replicas.replicas:
+    if replica.async_engine is not None:
+        instrument(replica.async_engine.sync_engine)
+
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+def pool_status(pool: Pool, name: str) -> PoolStatus:
+    status = PoolStatus(name=name, pid=os.getpid(), pool_class=type(pool).__name__)
+    if isinstance(pool, QueuePool):
+        status.size = pool.size()
+        status.checked_in = pool.checkedin()
+        status.checked_out = pool.checkedout()
+        # overflow() starts at -pool_size and only goes positive past the pool
+        status.overflow = max(pool.overflow(), 0)
+    wait_stats: PoolWaitStats | None = getattr(pool, "wait_stats", None)
+    if wait_stats:
+        status.checkouts = wait_stats.checkouts
+        status.timeouts = wait_stats.timeouts
+        status.wait_seconds_total = wait_stats.wait_seconds_total
+        status.wait_seconds_max = wait_stats.wait_seconds_max
+    return status
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,183 @@
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any, TypeVar
+
+from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# These run inside the worker processes, keep them free of app imports
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _timed(fn: Callable[..., T], *args: Any) -> tuple[T, float]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class HashingBusyError(Exception):
+    pass
+
+
+@dataclass
+class OperationStats:
+    count: int = 0
+    rejected: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    queue_seconds_total: float = 0.0
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a pool of worker processes instead of on the request thread.
+
+    At most `max_pending` operations may be queued or running at once. Up to
+    `max_waiting` more callers wait up to `queue_timeout` seconds for one of
+    those slots, and any caller beyond them or past the timeout gets a
+    HashingBusyError. Every caller holds a threadpool thread until it is
+    done, so the two bounds together cap the threads hashing can take from
+    the sync routes. With `workers=0` operations run inline.
+    """
+
+    def __init__(
+        self, *, workers: int, max_pending: int, max_waiting: int, queue_timeout: float
+    ) -> None:
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.max_callers = max_pending + max_waiting
+        self._callers = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, OperationStats] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so each server worker gets its own pool after forking
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _stats_for(self, operation: str) -> OperationStats:
+        with self._stats_lock:
+            return self._stats.setdefault(operation, OperationStats())
+
+    def _reject(self, stats: OperationStats) -> HashingBusyError:
+        with self._stats_lock:
+            stats.rejected += 1
+        return HashingBusyError("Password hashing is overloaded, try again later.")
+
+    @contextmanager
+    def _caller(self, stats: OperationStats) -> Iterator[None]:
+        with self._lock:
+            if self._callers >= self.max_callers:
+                raise self._reject(stats)
+            self._callers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callers -= 1
+
+    def _acquire_slot(self, stats: OperationStats) -> None:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise self._reject(stats)
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> Future[tuple[T, float]]:
+        """Run `fn` in the pool, holding a slot (already acquired) until it is done."""
+        try:
+            future = self._get_executor().submit(_timed, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run_inline(self, fn: Callable[..., T], *args: Any) -> tuple[T, float]:
+        try:
+            return _timed(fn, *args)
+        finally:
+            self._slots.release()
+
+    def _record(
+        self, stats: OperationStats, elapsed: float, run_seconds: float
+    ) -> None:
+        with self._stats_lock:
+            stats.count += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.queue_seconds_total += elapsed - run_seconds
+
+    def run(self, operation: str, fn: Callable[..., T], *args: Any) -> T:
+        stats = self._stats_for(operation)
+        start = time.perf_counter()
+        with self._caller(stats):
+            self._acquire_slot(stats)
+            if self.workers:
+                result, run_seconds = self._submit(fn, *args).result()
+            else:
+                result, run_seconds = self._run_inline(fn, *args)
+        self._record(stats, time.perf_counter() - start, run_seconds)
+        return result
+
+    def run_many(
+        self, operation: str, fn: Callable[..., T], args: list[tuple[Any, ...]]
+    ) -> list[T]:
+        """
+        Run `fn` over many argument tuples spread across all the workers,
+        taking a slot per operation like `run` does.
+        """
+        stats = self._stats_for(operation)
+        with self._caller(stats):
+            if not self.workers:
+                results = []
+                for a in args:
+                    self._acquire_slot(stats)
+                    result, run_seconds = self._run_inline(fn, *a)
+                    self._record(stats, run_seconds, run_seconds)
+                    results.append(result)
+                return results
+            futures: list[Future[tuple[T, float]]] = []
+            try:
+                for a in args:
+                    self._acquire_slot(stats)
+                    futures.append(self._submit(fn, *a))
+            except HashingBusyError:
+                for future in futures:
+                    future.cancel()
+                raise
+            timed = [future.result() for future in futures]
+        for _, run_seconds in timed:
+            self._record(stats, run_seconds, run_seconds)
+        return [result for result, _ in timed]
+
+    def stats(self) -> dict[str, OperationStats]:
+        with self._stats_lock:
+            return {
+                operation: replace(stats) for operation, stats in self._stats.items()
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
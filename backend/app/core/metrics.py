@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds, the +Inf bucket is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Label of requests that matched no route, so unknown paths add no series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Per-bucket counts (not cumulative) and sum of observed values."""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class RequestMetrics:
+    """
+    HTTP request metrics of this worker process.
+
+    Latency and response size histograms are kept per (route, method) and
+    response counts per (route, method, status). With `directory` set, each
+    worker periodically writes a snapshot to `<directory>/<pid>.json` and
+    `render()` sums the snapshots of all workers, so any worker can answer a
+    scrape for the whole server. The directory must be emptied when the
+    server starts. Files of exited workers are kept, so that counters do not
+    go backwards, but their in-flight requests are not counted.
+    """
+
+    def __init__(self, *, directory: str | None, flush_interval: float) -> None:
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.in_flight = 0
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.size: dict[tuple[str, str], Histogram] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def observe(
+        self, route: str, method: str, status: int, seconds: float, size: int
+    ) -> None:
+        key = (route, method)
+        with self._lock:
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(len(LATENCY_BUCKETS) + 1)
+                self.size[key] = Histogram(len(SIZE_BUCKETS) + 1)
+            latency.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            latency.sum += seconds
+            response_size = self.size[key]
+            response_size.counts[bisect_left(SIZE_BUCKETS, size)] += 1
+            response_size.sum += size
+            status_key = (route, method, status)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "in_flight": self.in_flight,
+                "latency": [
+                    [*k, list(h.counts), h.sum] for k, h in self.latency.items()
+                ],
+                "size": [[*k, list(h.counts), h.sum] for k, h in self.size.items()],
+                "responses": [[*k, n] for k, n in self.responses.items()],
+            }
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        path = self.directory / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        tmp.replace(path)
+
+    def run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Writing the metrics snapshot failed")
+
+    def start(self) -> None:
+        if self.directory is not None and self._thread is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self.run, name="metrics", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.flush()
+
+    def snapshots(self) -> list[dict[str, Any]]:
+        """This worker's current snapshot and the last ones written by the others."""
+        own = self.snapshot()
+        result = [own]
+        if self.directory is None:
+            return result
+        for path in self.directory.glob("*.json"):
+            if path.stem == str(own["pid"]):
+                continue
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Removed or being replaced meanwhile
+                continue
+            if not pid_alive(snapshot["pid"]):
+                snapshot["in_flight"] = 0
+            result.append(snapshot)
+        return result
+
+    def render(self) -> str:
+        """All workers' metrics in the Prometheus text exposition format."""
+        in_flight = 0
+        latency: dict[tuple[str, str], list[Any]] = {}
+        size: dict[tuple[str, str], list[Any]] = {}
+        responses: dict[tuple[str, str, int], int] = {}
+        for snapshot in self.snapshots():
+            in_flight += snapshot["in_flight"]
+            merge_histograms(latency, snapshot["latency"])
+            merge_histograms(size, snapshot["size"])
+            for route, method, status, count in snapshot["responses"]:
+                key = (route, method, status)
+                responses[key] = responses.get(key, 0) + count
+
+        lines = [
+            "# HELP http_requests_in_flight Requests being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+            "# HELP http_requests_total Responses by route, method and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (route, method, status), count in sorted(responses.items()):
+            lines.append(
+                f'http_requests_total{{route="{route}",method="{method}",'
+                f'status="{status}"}} {count}'
+            )
+        lines += render_histogram(
+            "http_request_duration_seconds",
+            "Time until the last byte of the response was sent.",
+            LATENCY_BUCKETS,
+            latency,
+        )
+        lines += render_histogram(
+            "http_response_size_bytes", "Size of the response body.", SIZE_BUCKETS, size
+        )
+        return "\n".join(lines) + "\n"
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_histograms(
+    into: dict[tuple[str, str], list[Any]], rows: Iterable[list[Any]]
+) -> None:
+    for route, method, counts, total in rows:
+        merged = into.get((route, method))
+        if merged is None:
+            into[(route, method)] = [list(counts), total]
+        else:
+            merged[0] = [a + b for a, b in zip(merged[0], counts, strict=True)]
+            merged[1] += total
+
+
+def render_histogram(
+    name: str,
+    help: str,
+    buckets: tuple[float, ...],
+    histograms: dict[tuple[str, str], list[Any]],
+) -> list[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    bounds = [str(bound) for bound in buckets] + ["+Inf"]
+    for (route, method), (counts, total) in sorted(histograms.items()):
+        labels = f'route="{route}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(bounds, counts, strict=True):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records every HTTP request in `metrics`.
+
+    Requests are labelled with the `unique_id` of the route they matched,
+    e.g. `tasks-read_projects`. Latency runs until the last body chunk was
+    sent, so for streamed responses it covers the whole stream.
+    """
+
+    def __init__(self, app: ASGIApp, *, metrics: RequestMetrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "unique_id", None) or UNMATCHED_ROUTE
+            metrics.observe(
+                route, scope["method"], status, time.perf_counter() - start, size
+            )
+
+
+request_metrics = RequestMetrics(
+    directory=settings.METRICS_DIR, flush_interval=settings.METRICS_FLUSH_INTERVAL
+)
@@ -2,11 +2,16 @@ from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.hashing import PasswordHasher, check_password, hash_password
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    max_waiting=settings.PASSWORD_HASH_MAX_WAITING,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
 
 
 ALGORITHM = "HS256"
@@ -20,8 +25,14 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.run(
+        "verify", check_password, plain_password, hashed_password
+    )
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.run("hash", hash_password, password)
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    return password_hasher.run_many("hash", hash_password, [(p,) for p in passwords])
@@ -1,19 +1,229 @@
+import base64
+import html
+import json
 import uuid
-from typing import Any, List, Optional
-from datetime import datetime
-from sqlmodel import Session, select
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, List, Optional, TypeVar
+from datetime import datetime, timedelta
+from sqlalchemy import (
+    ARRAY,
+    ColumnElement,
+    Double,
+    Table,
+    Text,
+    bindparam,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    text,
+    tuple_,
+    union,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import InstrumentedAttribute, Mapped, joinedload, selectinload
+from sqlmodel import Session, col, select
+from sqlmodel.sql.expression import SelectOfScalar
 
+from app.core.cache import (
+    count_cache,
+    current_user_cache,
+    project_role_cache,
+    project_summary_cache,
+)
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models import (
+    CountStrategyEnum,
+    BulkError,
+    EmailStatusEnum,
+    OutboxEmail,
     Item, ItemCreate, User, UserCreate, UserUpdate,
     Project,
     ProjectMember,
+    ProjectDetailPublic,
+    ProjectMemberBulkItem,
+    ProjectMemberDetailPublic,
+    ProjectMemberPublic,
+    ProjectPublic,
+    ProjectMemberTaskCounts,
+    ProjectSummary,
     Task,
     TaskComment,
+    TaskCommentPublic,
+    TaskCreate,
+    TaskPublic,
+    TasksBulkUpdate,
     TaskStatusEnum,
-    ProjectRoleEnum
+    ProjectEventTypeEnum,
+    ProjectRoleEnum,
+    SEARCH_CONFIG,
+    SearchKindEnum,
+    SearchResult,
+    row_version,
 )
 
+T = TypeVar("T")
+
+
+# ---- KEYSET PAGINATION ----
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def key_attribute(key: Mapped[Any]) -> InstrumentedAttribute[Any]:
+    # col() types model attributes as Mapped, they are instrumented attributes
+    assert isinstance(key, InstrumentedAttribute)
+    return key
+
+
+def key_python_type(key: Mapped[Any]) -> Any:
+    # Paging a subquery (search) keys it by its columns instead of attributes
+    if isinstance(key, ColumnElement):
+        return key.type.python_type
+    return key_attribute(key).type.python_type
+
+
+def decode_cursor(cursor: str, keys: Sequence[Mapped[Any]]) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(keys):
+            raise ValueError
+        values: list[Any] = []
+        for key, value in zip(keys, raw, strict=True):
+            # encode_cursor writes strings only, anything else was not made by it
+            if not isinstance(value, str):
+                raise ValueError
+            python_type = key_python_type(key)
+            if python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_statement(
+    statement: SelectOfScalar[T],
+    keys: Sequence[Mapped[Any]],
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    descending: bool = False,
+) -> SelectOfScalar[T]:
+    """
+    Restrict `statement` to the page that follows `cursor`, ordered by `keys`.
+
+    The keys must form a unique, indexed sort key so that every page is a
+    single index range scan no matter how deep it is. `skip` is only kept for
+    clients that still page by offset and is ignored when a cursor is given.
+    One extra row is fetched to tell whether there is a next page.
+    With `descending` the page walks backwards from the cursor.
+    """
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        if descending:
+            statement = statement.where(tuple_(*keys) < tuple_(*values))
+        else:
+            statement = statement.where(tuple_(*keys) > tuple_(*values))
+    elif skip:
+        statement = statement.offset(skip)
+    if descending:
+        return statement.order_by(*(key.desc() for key in keys)).limit(limit + 1)
+    return statement.order_by(*keys).limit(limit + 1)
+
+
+def keyset_page(
+    rows: Sequence[T], keys: Sequence[Mapped[Any]], limit: int
+) -> tuple[Sequence[T], Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(
+        [getattr(rows[-1], key_attribute(key).key) for key in keys]
+    )
+
+
+def paginate(
+    *,
+    session: Session,
+    statement: SelectOfScalar[T],
+    keys: Sequence[Mapped[Any]],
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> tuple[Sequence[T], Optional[str]]:
+    """Fetch one page of `statement`, see `keyset_statement`."""
+    statement = keyset_statement(statement, keys, cursor=cursor, skip=skip, limit=limit)
+    return keyset_page(session.exec(statement).all(), keys, limit)
+
+
+# ---- LIST COUNTS ----
+def estimate_rows(*, session: Session, statement: SelectOfScalar[Any]) -> int:
+    """
+    Planner estimate of the number of rows `statement` returns.
+
+    An unfiltered single-table statement reads pg_class.reltuples, anything
+    else, or a table that was never analyzed, asks EXPLAIN.
+    """
+    connection = session.connection()
+    froms = statement.get_final_froms()
+    if (
+        statement.whereclause is None
+        and len(froms) == 1
+        and isinstance(froms[0], Table)
+    ):
+        reltuples = connection.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": connection.dialect.identifier_preparer.format_table(froms[0])},  # type: ignore[no-untyped-call]
+        ).scalar_one()
+        # -1 until the table is first vacuumed or analyzed
+        if reltuples >= 0:
+            return int(reltuples)
+    compiled = statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(
+    *,
+    session: Session,
+    statement: SelectOfScalar[Any],
+    strategy: Optional[CountStrategyEnum] = None,
+) -> tuple[Optional[int], CountStrategyEnum]:
+    """
+    Total for a list endpoint, with `strategy` defaulting to LIST_COUNT_STRATEGY.
+
+    Exact counts are cached per compiled statement and parameters, so the
+    same filter is counted at most once per COUNT_CACHE_TTL.
+    """
+    strategy = strategy or CountStrategyEnum(settings.LIST_COUNT_STRATEGY)
+    if strategy == CountStrategyEnum.NONE:
+        return None, strategy
+    if strategy == CountStrategyEnum.ESTIMATED:
+        return estimate_rows(session=session, statement=statement), strategy
+
+    compiled = statement.compile()
+    key = (str(compiled), tuple(sorted(compiled.params.items())))
+    count = count_cache.get(key)
+    if count is None:
+        count = session.exec(
+            select(func.count()).select_from(statement.order_by(None).subquery())
+        ).one()
+        count_cache.set(key, count)
+    return count, strategy
+
+
 def create_user(*, session: Session, user_create: UserCreate) -> User:
     db_obj = User.model_validate(
         user_create, update={"hashed_password": get_password_hash(user_create.password)}
@@ -34,6 +244,7 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
+    current_user_cache.invalidate(str(db_user.id))
     session.refresh(db_user)
     return db_user
 
@@ -75,24 +286,153 @@ def create_project(*, session: Session, name: str, description: Optional[str], o
 
 
 
+def invalidate_project_cache(project_id: uuid.UUID) -> None:
+    """Drop cached reads of a project after its tasks, comments or members changed."""
+    project_summary_cache.invalidate(project_id)
+
+
+def invalidate_project_roles(
+    project_id: uuid.UUID, user_ids: Iterable[uuid.UUID]
+) -> None:
+    """Drop the cached roles of users whose membership of a project changed."""
+    for user_id in user_ids:
+        project_role_cache.invalidate((project_id, user_id))
+
+
+def project_role_statement(project_id: uuid.UUID, user_id: uuid.UUID) -> Any:
+    # The project by primary key, outer joined to the user's membership
+    # through the (project_id, user_id) unique index
+    return (
+        select(Project.owner_id, ProjectMember.role)
+        .outerjoin(
+            ProjectMember,
+            (col(ProjectMember.project_id) == Project.id)
+            & (col(ProjectMember.user_id) == user_id),
+        )
+        .where(Project.id == project_id)
+    )
+
+
+def get_project_role(
+    *, session: Session, project_id: uuid.UUID, user_id: uuid.UUID
+) -> Optional[ProjectRoleEnum]:
+    """
+    Role of a user in a project, None when they are not a member or the
+    project does not exist. The project's owner is always an owner.
+    """
+    key = (project_id, user_id)
+    cached = project_role_cache.get(key)
+    if cached is not None:
+        return cached[0]
+    role = None
+    row = session.exec(project_role_statement(project_id, user_id)).first()
+    if row is not None:
+        owner_id, role = row
+        if owner_id == user_id:
+            role = ProjectRoleEnum.OWNER
+    project_role_cache.set(key, (role,))
+    return role
+
+
 def get_project_by_id(*, session: Session, project_id: uuid.UUID) -> Optional[Project]:
     return session.get(Project, project_id)
 
 
-def list_projects(*, session: Session) -> List[Project]:
-    statement = select(Project)
-    return session.exec(statement).all()
+def list_projects(
+    *, session: Session, cursor: Optional[str] = None, skip: int = 0, limit: int = 100
+) -> tuple[Sequence[Project], Optional[str]]:
+    return paginate(
+        session=session,
+        statement=select(Project),
+        keys=[col(Project.id)],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
 
 
 def delete_project(*, session: Session, project_id: uuid.UUID) -> bool:
     project = get_project_by_id(session=session, project_id=project_id)
     if project:
+        user_ids = session.exec(
+            select(ProjectMember.user_id).where(ProjectMember.project_id == project_id)
+        ).all()
         session.delete(project)
         session.commit()
+        invalidate_project_cache(project_id)
+        invalidate_project_roles(project_id, [project.owner_id, *user_ids])
         return True
     return False
 
 
+PROJECT_INCLUDES = {"owner", "members", "members.user", "tasks"}
+
+
+def parse_project_includes(include: Optional[str]) -> set[str]:
+    includes = {part.strip() for part in (include or "").split(",") if part.strip()}
+    unknown = includes - PROJECT_INCLUDES
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(sorted(unknown))}.")
+    if "members.user" in includes:
+        includes.add("members")
+    return includes
+
+
+def get_project_detail(
+    *, session: Session, project_id: uuid.UUID, include: set[str]
+) -> Optional[ProjectDetailPublic]:
+    """
+    Load a project with the related objects named in `include`.
+
+    Each relationship is eager-loaded for all rows at once, so the project
+    costs at most five queries however many members and tasks it has: the
+    project joined to its owner, members, their users, tasks, and the task
+    count per member. Relationships that were not asked for are never
+    touched, so they cannot lazy-load.
+    """
+    options: list[Any] = []
+    if "owner" in include:
+        options.append(joinedload(Project.owner))  # type: ignore[arg-type]
+    if "members" in include:
+        members = selectinload(Project.members)  # type: ignore[arg-type]
+        if "members.user" in include:
+            members = members.selectinload(ProjectMember.user)  # type: ignore[arg-type]
+        options.append(members)
+    if "tasks" in include:
+        options.append(selectinload(Project.tasks))  # type: ignore[arg-type]
+    project = session.exec(
+        select(Project).where(Project.id == project_id).options(*options)
+    ).first()
+    if not project:
+        return None
+
+    fields: dict[str, Any] = ProjectPublic.model_validate(project).model_dump()
+    if "owner" in include:
+        fields["owner"] = project.owner
+    if "members" in include:
+        task_counts = dict(
+            session.exec(
+                select(col(Task.assigned_member_id), func.count())
+                .where(
+                    Task.project_id == project_id,
+                    col(Task.assigned_member_id).is_not(None),
+                )
+                .group_by(col(Task.assigned_member_id))
+            ).all()
+        )
+        fields["members"] = [
+            ProjectMemberDetailPublic(
+                **ProjectMemberPublic.model_validate(member).model_dump(),
+                task_count=task_counts.get(member.id, 0),
+                **({"user": member.user} if "members.user" in include else {}),
+            )
+            for member in project.members
+        ]
+    if "tasks" in include:
+        fields["tasks"] = project.tasks
+    return ProjectDetailPublic(**fields)
+
+
 # ---- PROJECT MEMBER CRUD ----
 def add_member_to_project(*, session: Session, project_id: uuid.UUID, user_id: uuid.UUID, role: ProjectRoleEnum) -> Optional[ProjectMember]:
     # Ensure the user exists before adding them to the project
@@ -103,6 +443,8 @@ def add_member_to_project(*, session: Session, project_id: uuid.UUID, user_id: u
     db_member = ProjectMember(project_id=project_id, user_id=user_id, role=role)
     session.add(db_member)
     session.commit()
+    invalidate_project_cache(project_id)
+    invalidate_project_roles(project_id, [user_id])
     session.refresh(db_member)
     return db_member
 
@@ -111,18 +453,373 @@ def get_project_members(*, session: Session, project_id: uuid.UUID) -> List[Proj
     return session.exec(statement).all()
 
 
+def unassign_member_tasks(
+    *, session: Session, project_id: uuid.UUID, user_ids: Iterable[uuid.UUID]
+) -> Sequence[Task]:
+    """
+    Unassign the tasks of the members of `user_ids`, before they are removed
+    from the project. ON DELETE SET NULL would leave the task versions, and
+    so their ETags, unchanged and publish no events.
+    """
+    member_ids = select(col(ProjectMember.id)).where(
+        col(ProjectMember.project_id) == project_id,
+        col(ProjectMember.user_id).in_(user_ids),
+    )
+    tasks = session.scalars(
+        update(Task)
+        .where(
+            col(Task.project_id) == project_id,
+            col(Task.assigned_member_id).in_(member_ids),
+        )
+        .values(assigned_member_id=None, version=row_version.next_value())
+        .returning(Task)
+    ).all()
+    for task in tasks:
+        session.expunge(task)
+    publish_project_events(
+        session=session,
+        events=(task_event(ProjectEventTypeEnum.TASK_UPDATED, task) for task in tasks),
+    )
+    return tasks
+
+
 def remove_member_from_project(*, session: Session, project_id: uuid.UUID, user_id: uuid.UUID) -> bool:
     statement = select(ProjectMember).where(
         (ProjectMember.project_id == project_id) & (ProjectMember.user_id == user_id)
     )
     db_member = session.exec(statement).first()
     if db_member:
+        unassign_member_tasks(
+            session=session, project_id=project_id, user_ids=[user_id]
+        )
         session.delete(db_member)
         session.commit()
+        invalidate_project_cache(project_id)
+        invalidate_project_roles(project_id, [user_id])
         return True
     return False
 
 
+def update_members_bulk(
+    *,
+    session: Session,
+    project_id: uuid.UUID,
+    members_in: Sequence[ProjectMemberBulkItem],
+) -> tuple[Sequence[ProjectMember], List[BulkError]]:
+    """
+    Add, update and remove many project members in one transaction.
+
+    Users are resolved by id or email in a single query, memberships are
+    upserted with ON CONFLICT (project_id, user_id) and the resulting roster
+    is returned. Entries that match no user are reported back by index.
+    """
+    ids = {m.user_id for m in members_in if m.user_id}
+    emails = {m.email for m in members_in if not m.user_id and m.email}
+    users = session.exec(
+        select(User.id, User.email).where(
+            or_(col(User.id).in_(ids), col(User.email).in_(emails))
+        )
+    ).all()
+    user_ids = {user_id for user_id, _ in users}
+    ids_by_email = {email: user_id for user_id, email in users}
+
+    # Later entries for the same user win, ON CONFLICT can't touch a row twice
+    roles: dict[uuid.UUID, ProjectRoleEnum] = {}
+    removed: set[uuid.UUID] = set()
+    errors: List[BulkError] = []
+    for index, member_in in enumerate(members_in):
+        user_id = member_in.user_id if member_in.user_id in user_ids else None
+        if not member_in.user_id and member_in.email:
+            user_id = ids_by_email.get(member_in.email)
+        if not user_id:
+            errors.append(BulkError(index=index, detail="User does not exist."))
+            continue
+        if member_in.remove:
+            roles.pop(user_id, None)
+            removed.add(user_id)
+        else:
+            removed.discard(user_id)
+            roles[user_id] = member_in.role
+
+    if roles:
+        statement = pg_insert(ProjectMember).values(
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "project_id": project_id,
+                    "user_id": user_id,
+                    "role": role,
+                }
+                for user_id, role in roles.items()
+            ]
+        )
+        session.exec(
+            statement.on_conflict_do_update(  # type: ignore
+                index_elements=["project_id", "user_id"],
+                set_={
+                    "role": statement.excluded.role,
+                    "version": row_version.next_value(),
+                },
+            )
+        )
+    if removed:
+        unassign_member_tasks(session=session, project_id=project_id, user_ids=removed)
+        session.exec(
+            delete(ProjectMember).where(  # type: ignore
+                col(ProjectMember.project_id) == project_id,
+                col(ProjectMember.user_id).in_(removed),
+            )
+        )
+    session.commit()
+    invalidate_project_cache(project_id)
+    invalidate_project_roles(project_id, roles.keys() | removed)
+    # Read after the commit so the roster isn't expired and refreshed row by row
+    return get_project_members(session=session, project_id=project_id), errors
+
+
+# ---- ROW VERSIONS ----
+def project_version_statement(project_id: uuid.UUID) -> SelectOfScalar[Optional[int]]:
+    return select(col(Project.version)).where(Project.id == project_id)
+
+
+def project_tasks_version_statement(project_id: uuid.UUID) -> Any:
+    # Deleting a task lowers the count, any insert or update raises the max
+    return select(func.count(col(Task.id)), func.max(Task.version)).where(
+        Task.project_id == project_id
+    )
+
+
+def task_comments_version_statement(task_id: uuid.UUID) -> Any:
+    # Comments are never edited, so new ones are the only change
+    return select(
+        func.count(col(TaskComment.id)), func.max(TaskComment.created_at)
+    ).where(TaskComment.task_id == task_id)
+
+
+def get_project_version(*, session: Session, project_id: uuid.UUID) -> Optional[int]:
+    return session.exec(project_version_statement(project_id)).first()
+
+
+def get_project_tasks_version(
+    *, session: Session, project_id: uuid.UUID
+) -> tuple[Any, ...]:
+    return tuple(session.exec(project_tasks_version_statement(project_id)).one())
+
+
+def get_task_comments_version(
+    *, session: Session, task_id: uuid.UUID
+) -> tuple[Any, ...]:
+    return tuple(session.exec(task_comments_version_statement(task_id)).one())
+
+
+# ---- PROJECT SUMMARY ----
+def get_project_summary(*, session: Session, project_id: uuid.UUID) -> ProjectSummary:
+    """
+    Count a project's tasks by status and by assignee in a single query.
+
+    Members and tasks are full-outer-joined so every member gets a row, even
+    without tasks, and unassigned tasks land in the row without a member.
+    """
+    cached = project_summary_cache.get(project_id)
+    if cached is not None:
+        return cached
+
+    members = (
+        select(ProjectMember.id, ProjectMember.user_id)
+        .where(ProjectMember.project_id == project_id)
+        .subquery()
+    )
+    tasks = (
+        select(Task.id, Task.status, Task.assigned_member_id)
+        .where(Task.project_id == project_id)
+        .subquery()
+    )
+    last_comment_at = (
+        select(func.max(TaskComment.created_at))
+        .join(Task, col(TaskComment.task_id) == col(Task.id))
+        .where(Task.project_id == project_id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            members.c.id,
+            members.c.user_id,
+            func.count(tasks.c.id).label("total"),
+            last_comment_at.label("last_comment_at"),
+            *(
+                func.count(tasks.c.id)
+                .filter(tasks.c.status == status)
+                .label(status.value)
+                for status in TaskStatusEnum
+            ),
+        )
+        .select_from(
+            members.join(tasks, tasks.c.assigned_member_id == members.c.id, full=True)
+        )
+        .group_by(members.c.id, members.c.user_id)
+    )
+    # Rows of the labelled columns, more than the typed select() overloads know
+    rows: Sequence[Any] = session.exec(statement).all()
+
+    summary = ProjectSummary(
+        project_id=project_id,
+        task_counts={status.value: 0 for status in TaskStatusEnum},
+        total=0,
+        unassigned=0,
+        member_count=0,
+        members=[],
+        last_comment_at=rows[0].last_comment_at if rows else None,
+    )
+    for row in rows:
+        counts = {status.value: row._mapping[status.value] for status in TaskStatusEnum}
+        for status, count in counts.items():
+            summary.task_counts[status] += count
+        summary.total += row.total
+        if row.id is None:
+            summary.unassigned += row.total
+        else:
+            summary.member_count += 1
+            summary.members.append(
+                ProjectMemberTaskCounts(
+                    member_id=row.id,
+                    user_id=row.user_id,
+                    task_counts=counts,
+                    total=row.total,
+                )
+            )
+    project_summary_cache.set(project_id, summary)
+    return summary
+
+
+# ---- PROJECT EXPORT ----
+EXPORT_BATCH_SIZE = 1000
+
+
+def iter_project_export(
+    *, session: Session, project_id: uuid.UUID
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield a project, its members, tasks and comments as flat records.
+
+    Each kind is one joined query read through a server-side cursor in
+    batches, so memory stays flat however large the project is.
+    """
+    project = session.get(Project, project_id)
+    if not project:
+        return
+    yield {"type": "project", **project.model_dump(exclude={"version"})}
+
+    # More columns than sqlmodel's select() overloads are typed for
+    members = (
+        select(  # type: ignore[call-overload]
+            ProjectMember.id,
+            ProjectMember.user_id,
+            ProjectMember.role,
+            User.email,
+            User.full_name,
+        )
+        .join(User, ProjectMember.user_id == User.id)
+        .where(ProjectMember.project_id == project_id)
+        .order_by(ProjectMember.id)
+    )
+    tasks = (
+        select(  # type: ignore[call-overload]
+            Task.id,
+            Task.title,
+            Task.description,
+            Task.status,
+            Task.assigned_member_id,
+            col(User.email).label("assignee_email"),
+        )
+        .outerjoin(ProjectMember, Task.assigned_member_id == ProjectMember.id)
+        .outerjoin(User, ProjectMember.user_id == User.id)
+        .where(Task.project_id == project_id)
+        .order_by(Task.id)
+    )
+    comments = (
+        select(  # type: ignore[call-overload]
+            TaskComment.id,
+            TaskComment.task_id,
+            TaskComment.author_id,
+            col(User.email).label("author_email"),
+            TaskComment.content,
+            TaskComment.created_at,
+        )
+        .join(Task, TaskComment.task_id == Task.id)
+        .join(User, TaskComment.author_id == User.id)
+        .where(Task.project_id == project_id)
+        .order_by(TaskComment.task_id, TaskComment.created_at, TaskComment.id)
+    )
+    for record_type, statement in (
+        ("member", members),
+        ("task", tasks),
+        ("comment", comments),
+    ):
+        rows = session.exec(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in rows:
+            yield {"type": record_type, **row._mapping}
+
+
+# ---- PROJECT EVENTS ----
+PROJECT_EVENTS_CHANNEL = "project_events"
+
+
+def project_event(
+    event_type: ProjectEventTypeEnum, project_id: uuid.UUID, data: dict[str, Any]
+) -> str:
+    return json.dumps(
+        {"type": event_type.value, "project_id": str(project_id), "data": data}
+    )
+
+
+def task_event(event_type: ProjectEventTypeEnum, task: Task) -> str:
+    return project_event(
+        event_type,
+        task.project_id,
+        TaskPublic.model_validate(task).model_dump(mode="json"),
+    )
+
+
+def project_events_statement(events: Sequence[str]) -> Any:
+    # One NOTIFY per event in a single statement, each payload prefixed with
+    # its event id, e.g. `1042:{"type": "task.updated", ...}`
+    # render_derived() names the column, `unnest(...) AS anon_1(payload)`
+    payloads = (
+        func.unnest(bindparam("events", list(events), type_=ARRAY(Text)))
+        .table_valued("payload")
+        .render_derived()
+    )
+    return select(
+        func.pg_notify(
+            PROJECT_EVENTS_CHANNEL,
+            func.concat(row_version.next_value(), ":", payloads.c.payload),
+        )
+    ).select_from(payloads)
+
+
+def publish_project_events(*, session: Session, events: Iterable[str]) -> None:
+    """
+    Notify the project event streams of changes made in the current
+    transaction. Postgres delivers them on commit, in commit order, and
+    drops them on rollback. `events` is not consumed when events are off.
+    """
+    if not settings.PROJECT_EVENTS:
+        return
+    events = list(events)
+    if events:
+        session.exec(project_events_statement(events))
+
+
+def publish_task_event(
+    *, session: Session, event_type: ProjectEventTypeEnum, task: Task
+) -> None:
+    if settings.PROJECT_EVENTS:
+        session.flush()
+        # The version is only known to the database until the row is reloaded
+        session.refresh(task)
+        publish_project_events(session=session, events=[task_event(event_type, task)])
+
+
 # ---- TASK CRUD ----
 def create_task(
     session: Session,
@@ -140,16 +837,128 @@ def create_task(
         status=status  # Use the provided status
     )
     session.add(db_task)
+    publish_task_event(
+        session=session, event_type=ProjectEventTypeEnum.TASK_CREATED, task=db_task
+    )
     session.commit()
+    invalidate_project_cache(project_id)
     session.refresh(db_task)
     return db_task
 
 
-def list_tasks(*, session: Session) -> List[Task]:
-    statement = select(Task)
-    return session.exec(statement).all()
+def create_tasks_bulk(
+    *, session: Session, project_id: uuid.UUID, tasks_in: Sequence[TaskCreate]
+) -> tuple[Sequence[Task], List[BulkError]]:
+    """
+    Insert many tasks in one transaction with a multi-row INSERT ... RETURNING.
+
+    Rows whose assignee is not a member of the project are skipped and
+    reported back by their index instead of failing the whole batch.
+    """
+    assignee_ids = {t.assigned_member_id for t in tasks_in if t.assigned_member_id}
+    member_ids = set()
+    if assignee_ids:
+        member_ids = set(
+            session.exec(
+                select(ProjectMember.id).where(
+                    ProjectMember.project_id == project_id,
+                    col(ProjectMember.id).in_(assignee_ids),
+                )
+            ).all()
+        )
+
+    rows: List[dict[str, Any]] = []
+    errors: List[BulkError] = []
+    for index, task_in in enumerate(tasks_in):
+        if task_in.assigned_member_id and task_in.assigned_member_id not in member_ids:
+            errors.append(
+                BulkError(
+                    index=index, detail="Project member not found in this project"
+                )
+            )
+            continue
+        rows.append(
+            {"id": uuid.uuid4(), "project_id": project_id, **task_in.model_dump()}
+        )
+
+    tasks: Sequence[Task] = []
+    if rows:
+        tasks = session.scalars(insert(Task).returning(Task), rows).all()
+        # Keep the RETURNING values, commit would expire them and refresh row by row
+        for task in tasks:
+            session.expunge(task)
+        publish_project_events(
+            session=session,
+            events=(
+                task_event(ProjectEventTypeEnum.TASK_CREATED, task) for task in tasks
+            ),
+        )
+        session.commit()
+        invalidate_project_cache(project_id)
+    return tasks, errors
+
+
+def update_tasks_bulk(
+    *, session: Session, project_id: uuid.UUID, tasks_in: TasksBulkUpdate
+) -> Sequence[Task]:
+    """
+    Change the status and/or assignee of every matching task of a project
+    with a single UPDATE ... RETURNING.
+
+    The caller is responsible for checking that a new assignee belongs to the project.
+    """
+    statement = update(Task).where(col(Task.project_id) == project_id)
+    if tasks_in.task_ids is not None:
+        statement = statement.where(col(Task.id).in_(tasks_in.task_ids))
+    if tasks_in.current_status:
+        statement = statement.where(col(Task.status) == tasks_in.current_status)
+    if tasks_in.current_assigned_member_id:
+        statement = statement.where(
+            col(Task.assigned_member_id) == tasks_in.current_assigned_member_id
+        )
+
+    values: dict[str, Any] = {"version": row_version.next_value()}
+    if tasks_in.status:
+        values["status"] = tasks_in.status
+    if tasks_in.unassign:
+        values["assigned_member_id"] = None
+    elif tasks_in.assigned_member_id:
+        values["assigned_member_id"] = tasks_in.assigned_member_id
+
+    tasks = session.scalars(statement.values(values).returning(Task)).all()
+    # Keep the RETURNING values, commit would expire them and refresh row by row
+    for task in tasks:
+        session.expunge(task)
+    publish_project_events(
+        session=session,
+        events=(task_event(ProjectEventTypeEnum.TASK_UPDATED, task) for task in tasks),
+    )
+    session.commit()
+    invalidate_project_cache(project_id)
+    return tasks
+
+
+def list_tasks(
+    *, session: Session, cursor: Optional[str] = None, skip: int = 0, limit: int = 100
+) -> tuple[Sequence[Task], Optional[str]]:
+    return paginate(
+        session=session,
+        statement=select(Task),
+        keys=[col(Task.id)],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+
 
-def get_task_by_id(*, session: Session, task_id: uuid.UUID) -> Optional[Task]:
+def get_task_by_id(
+    *, session: Session, task_id: uuid.UUID, for_update: bool = False
+) -> Optional[Task]:
+    if for_update:
+        # Lock the row and reload it, an instance already in the identity map
+        # would otherwise keep the values read before the lock
+        return session.get(Task, task_id, with_for_update=True, populate_existing=True)
+    # Any with_for_update, even False, skips the identity map
     return session.get(Task, task_id)
 
 
@@ -158,7 +967,11 @@ def update_task_status(*, session: Session, task_id: uuid.UUID, new_status: Task
     if task:
         task.status = new_status
         session.add(task)
+        publish_task_event(
+            session=session, event_type=ProjectEventTypeEnum.TASK_UPDATED, task=task
+        )
         session.commit()
+        invalidate_project_cache(task.project_id)
         session.refresh(task)
         return task
     return None
@@ -167,26 +980,316 @@ def update_task_status(*, session: Session, task_id: uuid.UUID, new_status: Task
 def delete_task(*, session: Session, task_id: uuid.UUID) -> bool:
     task = get_task_by_id(session=session, task_id=task_id)
     if task:
+        project_id = task.project_id
+        publish_project_events(
+            session=session,
+            events=[
+                project_event(
+                    ProjectEventTypeEnum.TASK_DELETED, project_id, {"id": str(task_id)}
+                )
+            ],
+        )
         session.delete(task)
         session.commit()
+        invalidate_project_cache(project_id)
         return True
     return False
 
 
 # ---- TASK COMMENT CRUD ----
+COMMENT_KEYS = [col(TaskComment.created_at), col(TaskComment.id)]
+
+
 def add_task_comment(*, session: Session, task_id: uuid.UUID, author_id: uuid.UUID, content: str) -> TaskComment:
     # Ensure the author exists
     author = session.get(User, author_id)
     if not author:
         raise ValueError("Author does not exist.")
+    task = session.get(Task, task_id)
+    if not task:
+        raise ValueError("Task does not exist.")
 
-    db_comment = TaskComment(task_id=task_id, author_id=author_id, content=content, created_at=datetime.utcnow())
+    db_comment = TaskComment(task_id=task_id, author_id=author_id, content=content)
     session.add(db_comment)
+    if settings.PROJECT_EVENTS:
+        session.flush()
+        # created_at is set by the database
+        session.refresh(db_comment)
+        publish_project_events(
+            session=session, events=[comment_event(db_comment, task.project_id)]
+        )
     session.commit()
     session.refresh(db_comment)
     return db_comment
 
 
-def get_comments_for_task(*, session: Session, task_id: uuid.UUID) -> List[TaskComment]:
+def comment_event(comment: TaskComment, project_id: uuid.UUID) -> str:
+    return project_event(
+        ProjectEventTypeEnum.COMMENT_CREATED,
+        project_id,
+        TaskCommentPublic.model_validate(comment).model_dump(mode="json"),
+    )
+
+
+def comments_statement(
+    *,
+    task_id: uuid.UUID,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+) -> SelectOfScalar[TaskComment]:
+    """
+    Select a page of a task's comments in (created_at, id) order.
+
+    Pages walk forward from `after`, or backward from `before`. `since` only
+    keeps comments created after that time, for incremental refreshes.
+    """
     statement = select(TaskComment).where(TaskComment.task_id == task_id)
-    return session.exec(statement).all()
\ No newline at end of file
+    if since:
+        statement = statement.where(col(TaskComment.created_at) > since)
+    if before:
+        return keyset_statement(
+            statement, COMMENT_KEYS, cursor=before, limit=limit, descending=True
+        )
+    return keyset_statement(statement, COMMENT_KEYS, cursor=after, limit=limit)
+
+
+def comments_page(
+    rows: Sequence[TaskComment],
+    *,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = 100,
+) -> tuple[Sequence[TaskComment], Optional[str], Optional[str]]:
+    """Turn the rows of `comments_statement` into (comments, next_cursor, prev_cursor)."""
+    rows, more = keyset_page(rows, COMMENT_KEYS, limit)
+    if not rows:
+        return rows, None, None
+    first = encode_cursor([rows[0].created_at, rows[0].id])
+    if before:
+        # Fetched newest first, the cursor row itself is still ahead of the page
+        return list(reversed(rows)), first, more
+    return rows, more, first if after else None
+
+
+def get_comments_for_task(
+    *,
+    session: Session,
+    task_id: uuid.UUID,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+) -> tuple[Sequence[TaskComment], Optional[str], Optional[str]]:
+    statement = comments_statement(
+        task_id=task_id, after=after, before=before, since=since, limit=limit
+    )
+    return comments_page(
+        session.exec(statement).all(), after=after, before=before, limit=limit
+    )
+
+
+# ---- SEARCH ----
+# ts_headline wraps matches in these control characters, so the excerpt can
+# be escaped as a whole before they are turned into <mark> tags
+HEADLINE_START, HEADLINE_STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = (
+    f"StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, "
+    "MaxWords=35, MinWords=15, MaxFragments=2"
+)
+
+
+def member_project_ids(user_id: uuid.UUID) -> Any:
+    return union(
+        select(Project.id).where(Project.owner_id == user_id),
+        select(ProjectMember.project_id).where(ProjectMember.user_id == user_id),
+    )
+
+
+def search_statement(
+    *,
+    q: str,
+    project_ids: Any = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Any:
+    """
+    Tasks and comments matching `q`, best first, restricted to `project_ids`
+    unless it is None.
+
+    Matches come from the GIN indexes on the generated search_vector
+    columns. Only the rows of the page are joined back to their text for
+    ts_headline, which is the expensive part.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    # search_vector is excluded from the mappers, so it is only on the tables
+    task_vector = Task.__table__.c.search_vector  # type: ignore[attr-defined]
+    comment_vector = TaskComment.__table__.c.search_vector  # type: ignore[attr-defined]
+    # More columns than sqlmodel's select() overloads are typed for
+    tasks = select(  # type: ignore[call-overload]
+        literal(SearchKindEnum.TASK.value).label("kind"),
+        col(Task.id).label("id"),
+        col(Task.id).label("task_id"),
+        col(Task.project_id).label("project_id"),
+        # As float8 so the rank survives the round trip through a cursor
+        cast(func.ts_rank(task_vector, query), Double).label("rank"),
+    ).where(task_vector.op("@@")(query))
+    comments = (
+        select(  # type: ignore[call-overload]
+            literal(SearchKindEnum.COMMENT.value),
+            TaskComment.id,
+            TaskComment.task_id,
+            Task.project_id,
+            cast(func.ts_rank(comment_vector, query), Double),
+        )
+        .join(Task, col(Task.id) == TaskComment.task_id)
+        .where(comment_vector.op("@@")(query))
+    )
+    if project_ids is not None:
+        tasks = tasks.where(col(Task.project_id).in_(project_ids))
+        comments = comments.where(col(Task.project_id).in_(project_ids))
+    hits = union_all(tasks, comments).subquery("hits")
+    keys = [hits.c.rank, hits.c.id]
+    page = keyset_statement(
+        select(hits),
+        keys,  # type: ignore[arg-type]
+        cursor=cursor,
+        limit=limit,
+        descending=True,
+    ).subquery("page")
+    content = case(
+        (
+            page.c.kind == SearchKindEnum.TASK.value,
+            func.concat_ws(" ", Task.title, Task.description),
+        ),
+        else_=TaskComment.content,
+    )
+    return (
+        select(  # type: ignore[call-overload]
+            page.c.kind,
+            page.c.id,
+            page.c.task_id,
+            page.c.project_id,
+            page.c.rank,
+            col(Task.title).label("task_title"),
+            func.ts_headline(SEARCH_CONFIG, content, query, HEADLINE_OPTIONS).label(
+                "headline"
+            ),
+        )
+        .join(Task, col(Task.id) == page.c.task_id)
+        .outerjoin(TaskComment, col(TaskComment.id) == page.c.id)
+        .order_by(page.c.rank.desc(), page.c.id.desc())
+    )
+
+
+def highlight(headline: str) -> str:
+    return (
+        html.escape(headline)
+        .replace(HEADLINE_START, "<mark>")
+        .replace(HEADLINE_STOP, "</mark>")
+    )
+
+
+def search(
+    *,
+    session: Session,
+    q: str,
+    user: User,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> tuple[List[SearchResult], Optional[str]]:
+    """Full-text search of the tasks and comments in the user's projects."""
+    # Superusers search every project
+    project_ids = None if user.is_superuser else member_project_ids(user.id)
+    rows = session.exec(
+        search_statement(q=q, project_ids=project_ids, cursor=cursor, limit=limit)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].rank, rows[-1].id])
+    results = [
+        SearchResult(
+            kind=row.kind,
+            id=row.id,
+            task_id=row.task_id,
+            project_id=row.project_id,
+            task_title=row.task_title,
+            headline=highlight(row.headline),
+        )
+        for row in rows
+    ]
+    return results, next_cursor
+
+
+# ---- EMAIL OUTBOX ----
+def enqueue_email(
+    *, session: Session, email_to: str, subject: str = "", html_content: str = ""
+) -> OutboxEmail:
+    """Queue an email for the outbox worker instead of sending it inline."""
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    db_email = OutboxEmail(
+        email_to=email_to, subject=subject, html_content=html_content
+    )
+    session.add(db_email)
+    session.commit()
+    return db_email
+
+
+def claim_outbox_batch(
+    *, session: Session, limit: int, lease: float
+) -> Sequence[OutboxEmail]:
+    """
+    Claim the next due emails for `lease` seconds and commit.
+
+    The next attempt of each claimed email is pushed past the lease, so the
+    emails can be sent outside any transaction while other workers skip
+    them. If the worker dies before recording the outcome, they are due
+    again once the lease is over. Rows locked by a concurrent claim are
+    skipped.
+    """
+    now = func.timezone("utc", func.now())
+    due = (
+        select(col(OutboxEmail.id))
+        .where(
+            OutboxEmail.status == EmailStatusEnum.PENDING,
+            OutboxEmail.next_attempt_at <= now,
+        )
+        .order_by(col(OutboxEmail.next_attempt_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    emails = session.scalars(
+        update(OutboxEmail)
+        .where(col(OutboxEmail.id).in_(due))
+        .values(next_attempt_at=now + timedelta(seconds=lease))
+        .returning(OutboxEmail)
+    ).all()
+    # Keep the RETURNING values, commit would expire them
+    for email in emails:
+        session.expunge(email)
+    session.commit()
+    return emails
+
+
+def get_outbox_counts(*, session: Session) -> dict[str, Any]:
+    now = func.timezone("utc", func.now())
+    pending = col(OutboxEmail.status) == EmailStatusEnum.PENDING
+    row = session.exec(
+        select(
+            func.count().filter(pending),
+            func.count().filter(pending, col(OutboxEmail.next_attempt_at) <= now),
+            func.count().filter(col(OutboxEmail.status) == EmailStatusEnum.FAILED),
+            func.extract(
+                "epoch", now - func.min(OutboxEmail.created_at).filter(pending)
+            ),
+        )
+    ).one()
+    pending_count, due, failed, oldest = row
+    return {
+        "pending": pending_count,
+        "due": due,
+        "failed": failed,
+        "oldest_pending_seconds": None if oldest is None else float(oldest),
+    }
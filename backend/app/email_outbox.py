@@ -0,0 +1,205 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Connection, Engine
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import EmailOutboxStats, EmailStatusEnum, OutboxEmail
+from app.utils import build_email, smtp_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerStats:
+    sent: int = 0
+    retried: int = 0
+    gave_up: int = 0
+    batches: int = 0
+    connections_opened: int = 0
+
+
+class EmailOutboxWorker:
+    """
+    Sends the emails queued in the outbox table from a background thread.
+
+    Each poll claims up to `batch_size` due emails and sends them over one
+    SMTP connection that is kept open between batches and closed after
+    `idle_timeout` seconds without mail. A failed email is retried after
+    `retry_backoff * 2**(attempts - 1)` seconds and marked failed after
+    `max_attempts`. Sent emails are deleted.
+
+    Claimed emails are leased for `lease` seconds in a committed
+    transaction and sent outside of it, so no row lock is held during SMTP.
+    A lease must outlast the sending of a whole batch, an email still
+    unsent when it ends may be sent twice.
+    """
+
+    def __init__(
+        self,
+        *,
+        db_engine: Engine | Connection,
+        batch_size: int,
+        poll_interval: float,
+        idle_timeout: float,
+        max_attempts: int,
+        retry_backoff: float,
+        lease: float,
+        backend_factory: Callable[[], Any] = smtp_backend,
+    ) -> None:
+        self.db_engine = db_engine
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease = lease
+        self.backend_factory = backend_factory
+        self._backend: Any = None
+        self._last_send = 0.0
+        self._stats = WorkerStats()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _get_backend(self) -> Any:
+        if self._backend is None:
+            self._backend = self.backend_factory()
+            self._stats.connections_opened += 1
+        return self._backend
+
+    def _close_backend(self) -> None:
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+    def _send(self, email: OutboxEmail) -> str | None:
+        """Send one email, returning the error if it failed."""
+        message = build_email(subject=email.subject, html_content=email.html_content)
+        error: str | None
+        try:
+            response = message.send(to=email.email_to, smtp=self._get_backend())
+        except Exception as e:
+            response, error = None, repr(e)
+        else:
+            error = (
+                None
+                if response and response.success
+                else repr(response and response.error)
+            )
+        if error:
+            # Start over with a fresh connection, the server may have dropped it
+            self._close_backend()
+        return error
+
+    def run_once(self) -> int:
+        """Send one batch of due emails, returning how many were claimed."""
+        with Session(self.db_engine) as session:
+            emails = crud.claim_outbox_batch(
+                session=session, limit=self.batch_size, lease=self.lease
+            )
+        if not emails:
+            return 0
+        # Sent with no transaction open, each outcome is committed on its own
+        for email in emails:
+            error = self._send(email)
+            with Session(self.db_engine) as session:
+                session.add(email)
+                if error is None:
+                    session.delete(email)
+                    self._stats.sent += 1
+                else:
+                    self._record_failure(email, error)
+                session.commit()
+        self._stats.batches += 1
+        self._last_send = time.monotonic()
+        return len(emails)
+
+    def _record_failure(self, email: OutboxEmail, error: str) -> None:
+        email.attempts += 1
+        email.last_error = error[:1000]
+        if email.attempts >= self.max_attempts:
+            email.status = EmailStatusEnum.FAILED
+            self._stats.gave_up += 1
+            logger.error(f"Giving up on email {email.id}: {error}")
+        else:
+            delay = self.retry_backoff * 2 ** (email.attempts - 1)
+            email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            self._stats.retried += 1
+            logger.warning(f"Email {email.id} failed, retrying in {delay}s: {error}")
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                self._close_backend()
+                claimed = 0
+            if claimed == self.batch_size:
+                # There may be more due already
+                continue
+            if time.monotonic() - self._last_send > self.idle_timeout:
+                self._close_backend()
+            self._stop.wait(self.poll_interval)
+        self._close_backend()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self.run, name="email-outbox", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self, *, session: Session) -> EmailOutboxStats:
+        return EmailOutboxStats(
+            pid=os.getpid(),
+            **crud.get_outbox_counts(session=session),
+            worker_running=self._thread is not None and self._thread.is_alive(),
+            sent=self._stats.sent,
+            retried=self._stats.retried,
+            gave_up=self._stats.gave_up,
+            batches=self._stats.batches,
+            connections_opened=self._stats.connections_opened,
+        )
+
+
+outbox_worker = EmailOutboxWorker(
+    db_engine=engine,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+    idle_timeout=settings.EMAIL_OUTBOX_IDLE_TIMEOUT,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_backoff=settings.EMAIL_OUTBOX_RETRY_BACKOFF,
+    lease=settings.EMAIL_OUTBOX_LEASE,
+)
+
+
+def main() -> None:
+    # Drain the outbox from its own process, e.g. with EMAIL_OUTBOX_WORKER=false
+    # on the API servers
+    logger.info("Starting email outbox worker")
+    try:
+        outbox_worker.run()
+    except KeyboardInterrupt:
+        logger.info("Email outbox worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import csv
+import logging
+import secrets
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, col, select
+
+from app import crud
+from app.core.db import engine
+from app.core.security import get_password_hashes
+from app.models import (
+    BulkError,
+    Project,
+    ProjectMember,
+    ProjectRoleEnum,
+    User,
+    UserCreate,
+    UserImportResult,
+    row_version,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CSV columns: email (required), full_name, password, project (a project
+# name) and role. Users without a password get a random one and are
+# expected to go through password recovery.
+STAGING_TABLE = """
+    CREATE TEMP TABLE user_import (
+        id uuid NOT NULL,
+        email varchar(255) NOT NULL,
+        full_name varchar(255),
+        hashed_password varchar NOT NULL,
+        member_id uuid NOT NULL,
+        project_id uuid,
+        role varchar(16)
+    ) ON COMMIT DROP
+"""
+
+MERGE_USERS = """
+    INSERT INTO "user" (id, email, full_name, hashed_password, is_active, is_superuser)
+    SELECT id, email, full_name, hashed_password, true, false FROM user_import
+    ON CONFLICT (email) DO NOTHING
+"""
+
+MERGE_MEMBERSHIPS = """
+    INSERT INTO projectmember (id, project_id, user_id, role)
+    SELECT i.member_id, i.project_id, u.id, i.role::projectroleenum
+    FROM user_import i JOIN "user" u ON u.email = i.email
+    WHERE i.project_id IS NOT NULL
+    ON CONFLICT (project_id, user_id) DO UPDATE
+    SET role = excluded.role, version = nextval('row_version_seq')
+"""
+
+
+@contextmanager
+def timed(timings: dict[str, float], stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+
+def import_users(
+    *, session: Session, csv_file: TextIO, max_rows: int | None = None
+) -> UserImportResult:
+    """
+    Create the users of a CSV file and their project memberships in one transaction.
+
+    Passwords are hashed in parallel on the hashing worker pool, existing
+    emails are filtered out with one query, and the new rows are loaded with
+    COPY into a staging table and merged from there. Existing users are not
+    changed, but their memberships are upserted like those of new users.
+    """
+    timings: dict[str, float] = {}
+    errors: list[BulkError] = []
+
+    with timed(timings, "parse"):
+        rows: list[dict[str, Any]] = []
+        project_names: set[str] = set()
+        seen: set[str] = set()
+        # Line 1 is the header
+        for line, record in enumerate(csv.DictReader(csv_file), start=2):
+            if max_rows is not None and len(rows) >= max_rows:
+                raise ValueError(f"At most {max_rows} users can be imported at once")
+            try:
+                user_in = UserCreate.model_validate(
+                    {
+                        "email": (record.get("email") or "").strip(),
+                        "full_name": (record.get("full_name") or "").strip() or None,
+                        "password": record.get("password") or secrets.token_urlsafe(12),
+                    }
+                )
+                role = ProjectRoleEnum(
+                    (record.get("role") or "employee").strip().lower()
+                )
+            except (ValidationError, ValueError) as e:
+                errors.append(BulkError(index=line, detail=str(e)))
+                continue
+            if user_in.email in seen:
+                errors.append(BulkError(index=line, detail="Duplicate email in file"))
+                continue
+            seen.add(user_in.email)
+            project = (record.get("project") or "").strip() or None
+            if project:
+                project_names.add(project)
+            rows.append(
+                {"line": line, "user": user_in, "project": project, "role": role}
+            )
+
+    with timed(timings, "dedupe"):
+        existing = dict(
+            session.exec(
+                select(User.email, User.id).where(col(User.email).in_(seen))
+            ).all()
+        )
+        project_ids = dict(
+            session.exec(
+                select(Project.name, Project.id).where(
+                    col(Project.name).in_(project_names)
+                )
+            ).all()
+        )
+        new_rows = []
+        existing_members: dict[tuple[uuid.UUID, uuid.UUID], ProjectRoleEnum] = {}
+        for row in rows:
+            if row["project"] and row["project"] not in project_ids:
+                errors.append(BulkError(index=row["line"], detail="Project not found"))
+                continue
+            user_id = existing.get(row["user"].email)
+            if user_id is None:
+                new_rows.append(row)
+            elif row["project"]:
+                existing_members[project_ids[row["project"]], user_id] = row["role"]
+
+    with timed(timings, "hash"):
+        hashes = get_password_hashes([row["user"].password for row in new_rows])
+
+    with timed(timings, "copy"):
+        connection = session.connection()
+        connection.execute(text(STAGING_TABLE))
+        cursor = connection.connection.driver_connection.cursor()  # type: ignore[union-attr]
+        with cursor.copy(
+            "COPY user_import (id, email, full_name, hashed_password, member_id, project_id, role) FROM STDIN"
+        ) as copy:
+            for row, hashed_password in zip(new_rows, hashes, strict=True):
+                copy.write_row(
+                    (
+                        uuid.uuid4(),
+                        row["user"].email,
+                        row["user"].full_name,
+                        hashed_password,
+                        uuid.uuid4(),
+                        project_ids.get(row["project"]),
+                        row["role"].name,
+                    )
+                )
+
+    with timed(timings, "merge"):
+        created = connection.execute(text(MERGE_USERS)).rowcount
+        memberships = connection.execute(text(MERGE_MEMBERSHIPS)).rowcount
+        if existing_members:
+            statement = pg_insert(ProjectMember).values(
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "project_id": project_id,
+                        "user_id": user_id,
+                        "role": role,
+                    }
+                    for (project_id, user_id), role in existing_members.items()
+                ]
+            )
+            upserted = connection.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["project_id", "user_id"],
+                    set_={
+                        "role": statement.excluded.role,
+                        "version": row_version.next_value(),
+                    },
+                ).returning(col(ProjectMember.id))
+            ).all()
+            memberships += len(upserted)
+        session.commit()
+    projects = {project_id for project_id, _ in existing_members}
+    projects.update(project_ids[row["project"]] for row in new_rows if row["project"])
+    for project_id in projects:
+        crud.invalidate_project_cache(project_id)
+    for project_id, user_id in existing_members:
+        crud.invalidate_project_roles(project_id, [user_id])
+
+    return UserImportResult(
+        created=created,
+        existing=len(existing),
+        memberships=memberships,
+        errors=errors,
+        timings=timings,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import users from a CSV file")
+    parser.add_argument(
+        "path", help="CSV file with an email,full_name,password,project,role header"
+    )
+    args = parser.parse_args()
+
+    logger.info("Importing users")
+    with (
+        Session(engine) as session,
+        open(args.path, newline="", encoding="utf-8-sig") as f,
+    ):
+        result = import_users(session=session, csv_file=f)
+    for error in result.errors:
+        logger.warning(f"line {error.index}: {error.detail}")
+    for stage, seconds in result.timings.items():
+        logger.info(f"{stage}: {seconds:.3f}s")
+    logger.info(
+        f"Created {result.created} users, skipped {result.existing} existing, "
+        f"set {result.memberships} memberships"
+    )
+
+
+if __name__ == "__main__":
+    main()
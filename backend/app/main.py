@@ -1,10 +1,21 @@
+import secrets
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import QueryStatsMiddleware
+from app.core.hashing import HashingBusyError
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, request_metrics
+from app.core.security import password_hasher
+from app.email_outbox import outbox_worker
+from app.project_events import event_broker
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,10 +25,29 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    run_outbox = settings.emails_enabled and settings.EMAIL_OUTBOX_WORKER
+    if run_outbox:
+        outbox_worker.start()
+    if settings.PROJECT_EVENTS:
+        event_broker.start()
+    if settings.METRICS_ENABLED:
+        request_metrics.start()
+    yield
+    request_metrics.stop()
+    await event_broker.stop()
+    if run_outbox:
+        outbox_worker.stop()
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +60,34 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+
+if settings.DB_QUERY_STATS:
+    app.add_middleware(
+        QueryStatsMiddleware, repeat_threshold=settings.DB_N_PLUS_ONE_THRESHOLD
+    )
+
+
+# Added last so that it is outermost and also times the CORS middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+
+@app.exception_handler(HashingBusyError)
+def hashing_busy_handler(_request: Request, exc: HashingBusyError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", tags=["metrics"], include_in_schema=False)
+    def metrics(request: Request) -> PlainTextResponse:
+        if settings.METRICS_TOKEN and not secrets.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+        ):
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return PlainTextResponse(request_metrics.render(), media_type=CONTENT_TYPE)
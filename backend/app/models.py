@@ -2,8 +2,19 @@ import uuid
 from datetime import datetime
 from enum import Enum
 from pydantic import EmailStr
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    Index,
+    Sequence,
+    UniqueConstraint,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
-from typing import List, Optional
+from typing import Any, List, Optional
 
 
 # ---- USER BASE ----
@@ -54,9 +65,28 @@ class UserPublic(UserBase):
     id: uuid.UUID
 
 
+class CountStrategyEnum(str, Enum):
+    # COUNT(*) over the filtered rows, possibly served from the count cache
+    EXACT = "exact"
+    # Planner estimate, from pg_class.reltuples or EXPLAIN
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
 class UsersPublic(SQLModel):
     data: List[UserPublic]
-    count: int
+    count: Optional[int]
+    count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT
+    next_cursor: Optional[str] = None
+
+
+class UserImportResult(SQLModel):
+    created: int
+    existing: int
+    memberships: int
+    # index is the CSV line number
+    errors: List["BulkError"]
+    timings: dict[str, float]
 
 
 # ---- ITEMS ----
@@ -74,6 +104,8 @@ class ItemUpdate(ItemBase):
 
 
 class Item(ItemBase, table=True):
+    __table_args__ = (Index("ix_item_owner_id_id", "owner_id", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE")
@@ -87,7 +119,9 @@ class ItemPublic(ItemBase):
 
 class ItemsPublic(SQLModel):
     data: List[ItemPublic]
-    count: int
+    count: Optional[int]
+    count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT
+    next_cursor: Optional[str] = None
 
 
 # ---- MESSAGES & TOKENS ----
@@ -104,6 +138,58 @@ class TokenPayload(SQLModel):
     sub: Optional[str] = None
 
 
+class PoolStatus(SQLModel):
+    name: str
+    pid: int
+    pool_class: str
+    size: int = 0
+    checked_in: int = 0
+    checked_out: int = 0
+    overflow: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    # Read replicas only
+    healthy: Optional[bool] = None
+    lag_seconds: Optional[float] = None
+
+
+class HashingStats(SQLModel):
+    operation: str
+    pid: int
+    count: int
+    rejected: int
+    total_seconds: float
+    max_seconds: float
+    queue_seconds_total: float
+
+
+class CacheStats(SQLModel):
+    name: str
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+
+
+class EmailOutboxStats(SQLModel):
+    pid: int
+    # Rows in the outbox table, shared by every worker
+    pending: int
+    due: int
+    failed: int
+    oldest_pending_seconds: Optional[float]
+    # This process's worker since it started
+    worker_running: bool
+    sent: int
+    retried: int
+    gave_up: int
+    batches: int
+    connections_opened: int
+
+
 class NewPassword(SQLModel):
     token: str
     new_password: str = Field(min_length=8, max_length=40)
@@ -123,6 +209,36 @@ class TaskStatusEnum(str, Enum):
     COMPLETED = "completed"
 
 
+class ProjectEventTypeEnum(str, Enum):
+    TASK_CREATED = "task.created"
+    TASK_UPDATED = "task.updated"
+    TASK_DELETED = "task.deleted"
+    COMMENT_CREATED = "comment.created"
+
+
+# ---- ROW VERSIONS ----
+# Projects, members and tasks draw a new version from one sequence on every
+# insert and update, so the largest version in a set of rows moves whenever
+# any of them is written. Versions back the ETag and If-Match headers.
+row_version = Sequence("row_version_seq")
+
+
+def version_field() -> Any:
+    return Field(
+        default=None,
+        sa_column=Column(
+            BigInteger,
+            row_version,
+            server_default=row_version.next_value(),
+            nullable=False,
+        ),
+    )
+
+
+def bump_version(_mapper: Any, _connection: Any, target: Any) -> None:
+    target.version = row_version.next_value()
+
+
 # ---- PROJECT ----
 class ProjectBase(SQLModel):
     name: str = Field(unique=True, index=True, max_length=255)
@@ -131,7 +247,10 @@ class ProjectBase(SQLModel):
 
 class Project(ProjectBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE")  # 🔥 Fixed FK
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )  # 🔥 Fixed FK
+    version: Optional[int] = version_field()
 
     # Relationships
     owner: User = Relationship()
@@ -148,10 +267,21 @@ class ProjectUpdate(ProjectBase):
 
 # ---- PROJECT MEMBERS ----
 class ProjectMember(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint(
+            "project_id", "user_id", name="uq_projectmember_project_id_user_id"
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    project_id: uuid.UUID = Field(foreign_key="project.id", nullable=False, ondelete="CASCADE")
-    user_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE")  # 🔥 Fixed FK
+    project_id: uuid.UUID = Field(
+        foreign_key="project.id", nullable=False, ondelete="CASCADE"
+    )
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )  # 🔥 Fixed FK
     role: ProjectRoleEnum = Field(default=ProjectRoleEnum.EMPLOYEE)
+    version: Optional[int] = version_field()
 
     # Relationships
     project: Project = Relationship(back_populates="members")
@@ -159,6 +289,21 @@ class ProjectMember(SQLModel, table=True):
     tasks: List["Task"] = Relationship(back_populates="assigned_member")
 
 
+class ProjectMemberPublic(SQLModel):
+    id: uuid.UUID
+    project_id: uuid.UUID
+    user_id: uuid.UUID
+    role: ProjectRoleEnum
+    version: int
+
+
+class ProjectMemberBulkItem(SQLModel):
+    user_id: Optional[uuid.UUID] = None
+    email: Optional[EmailStr] = None
+    role: ProjectRoleEnum = ProjectRoleEnum.EMPLOYEE
+    remove: bool = False
+
+
 # ---- TASKS ----
 class TaskBase(SQLModel):
     title: str = Field(max_length=255)
@@ -176,13 +321,60 @@ class TaskUpdate(TaskBase):
     description: Optional[str] = None
     assigned_member_id: Optional[uuid.UUID] = None  # Optional field
 
+class TasksBulkUpdate(SQLModel):
+    # Tasks of the project to change, every filter given must match
+    task_ids: Optional[List[uuid.UUID]] = None
+    current_status: Optional[TaskStatusEnum] = None
+    current_assigned_member_id: Optional[uuid.UUID] = None
+    # Changes applied to all of them
+    status: Optional[TaskStatusEnum] = None
+    assigned_member_id: Optional[uuid.UUID] = None
+    unassign: bool = False
+
+
+# ---- FULL-TEXT SEARCH ----
+# Text search configuration of the generated columns, queries must use the same
+SEARCH_CONFIG = "english"
+
+
+def search_vector_field(expression: str) -> Any:
+    # Generated by Postgres and only read by search queries. The models list it
+    # in exclude_properties, so it is never loaded with the rows or written.
+    return Field(
+        default=None,
+        sa_column=Column(
+            "search_vector", TSVECTOR, Computed(expression, persisted=True)
+        ),
+        exclude=True,
+    )
+
+
 class Task(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_task_project_id_status", "project_id", "status"),
+        Index("ix_task_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     description: Optional[str] = Field(default=None, max_length=500)
     status: TaskStatusEnum = Field(default=TaskStatusEnum.PENDING)
-    project_id: uuid.UUID = Field(foreign_key="project.id", nullable=False, ondelete="CASCADE")
-    assigned_member_id: Optional[uuid.UUID] = Field(foreign_key="projectmember.id", default=None, nullable=True, ondelete="SET NULL")
+    project_id: uuid.UUID = Field(
+        foreign_key="project.id", nullable=False, ondelete="CASCADE"
+    )
+    assigned_member_id: Optional[uuid.UUID] = Field(
+        foreign_key="projectmember.id",
+        default=None,
+        nullable=True,
+        ondelete="SET NULL",
+        index=True,
+    )
+    version: Optional[int] = version_field()
+    search_vector: Optional[str] = search_vector_field(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, title), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(description, '')), 'B')"
+    )
 
     project: Project = Relationship(back_populates="tasks")
     assigned_member: Optional[ProjectMember] = Relationship(back_populates="tasks")
@@ -192,27 +384,106 @@ class Task(SQLModel, table=True):
 
 # ---- TASK COMMENTS ----
 class TaskComment(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_taskcomment_task_id_created_at", "task_id", "created_at"),
+        Index("ix_taskcomment_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    task_id: uuid.UUID = Field(foreign_key="task.id", nullable=False, ondelete="CASCADE")
-    author_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE")  # 🔥 Fixed FK
+    task_id: uuid.UUID = Field(
+        foreign_key="task.id", nullable=False, ondelete="CASCADE"
+    )
+    author_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )  # 🔥 Fixed FK
     content: str = Field(max_length=1000)
-    created_at: datetime = Field(default=datetime.utcnow)
+    # Set by the database on insert, in UTC like the naive datetimes elsewhere
+    created_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": text("timezone('utc', now())")},
+    )
+    search_vector: Optional[str] = search_vector_field(
+        f"to_tsvector('{SEARCH_CONFIG}'::regconfig, content)"
+    )
 
     task: Task = Relationship(back_populates="comments")
     author: User = Relationship()
 
 
+# ---- EMAIL OUTBOX ----
+class EmailStatusEnum(str, Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+
+
+class OutboxEmail(SQLModel, table=True):
+    """Email waiting to be sent by the outbox worker, deleted once sent."""
+
+    __table_args__ = (
+        Index(
+            "ix_outboxemail_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    email_to: str = Field(max_length=255)
+    subject: str
+    html_content: str
+    status: EmailStatusEnum = Field(default=EmailStatusEnum.PENDING)
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": text("timezone('utc', now())")},
+    )
+    next_attempt_at: Optional[datetime] = Field(
+        default=None,
+        nullable=False,
+        sa_column_kwargs={"server_default": text("timezone('utc', now())")},
+    )
+
+
+for versioned in (Project, ProjectMember, Task):
+    event.listen(versioned, "before_update", bump_version)
+
+
 # ---- PUBLIC SCHEMAS ----
 class ProjectPublic(SQLModel):
     id: uuid.UUID
     name: str
     description: Optional[str]
     owner_id: uuid.UUID
+    version: int
+
+
+class ProjectMemberTaskCounts(SQLModel):
+    member_id: uuid.UUID
+    user_id: uuid.UUID
+    # Keyed by TaskStatusEnum value
+    task_counts: dict[str, int]
+    total: int
+
+
+class ProjectSummary(SQLModel):
+    project_id: uuid.UUID
+    task_counts: dict[str, int]
+    total: int
+    unassigned: int
+    member_count: int
+    members: List[ProjectMemberTaskCounts]
+    last_comment_at: Optional[datetime]
 
 
 class ProjectsPublic(SQLModel):
     data: List[ProjectPublic]
-    count: int
+    count: Optional[int]
+    count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT
+    next_cursor: Optional[str] = None
 
 
 class TaskPublic(SQLModel):
@@ -222,10 +493,74 @@ class TaskPublic(SQLModel):
     description: Optional[str]
     project_id: uuid.UUID
     assigned_member_id: Optional[uuid.UUID]
+    version: int
 
 
 class TasksPublic(SQLModel):
     data: List[TaskPublic]
-    count: int
+    count: Optional[int]
+    count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT
+    next_cursor: Optional[str] = None
+
+
+# Related objects are only set when asked for with `include`, unset fields
+# are left out of the response
+class ProjectMemberDetailPublic(ProjectMemberPublic):
+    task_count: int
+    user: Optional[UserPublic] = None
+
+
+class ProjectDetailPublic(ProjectPublic):
+    owner: Optional[UserPublic] = None
+    members: Optional[List[ProjectMemberDetailPublic]] = None
+    tasks: Optional[List[TaskPublic]] = None
+
+
+class BulkError(SQLModel):
+    index: int
+    detail: str
+
+
+class TaskCommentPublic(SQLModel):
+    id: uuid.UUID
+    task_id: uuid.UUID
+    author_id: uuid.UUID
+    content: str
+    created_at: datetime
+
+
+class TaskCommentsPublic(SQLModel):
+    data: List[TaskCommentPublic]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class SearchKindEnum(str, Enum):
+    TASK = "task"
+    COMMENT = "comment"
+
+
+class SearchResult(SQLModel):
+    kind: SearchKindEnum
+    # The task or the comment that matched
+    id: uuid.UUID
+    task_id: uuid.UUID
+    project_id: uuid.UUID
+    task_title: str
+    # Matching excerpt as HTML, search terms wrapped in <mark>, the rest escaped
+    headline: str
+
+
+class SearchResults(SQLModel):
+    data: List[SearchResult]
+    next_cursor: Optional[str] = None
+
+
+class TasksBulkPublic(SQLModel):
+    data: List[TaskPublic]
+    errors: List[BulkError]
+
 
-    
\ No newline at end of file
+class ProjectMembersBulkPublic(SQLModel):
+    data: List[ProjectMemberPublic]
+    errors: List[BulkError]
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator
+from contextlib import suppress
+from dataclasses import dataclass
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.crud import PROJECT_EVENTS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Sent when events may have been missed, clients reload what they show
+RESET = b"event: reset\ndata: {}\n\n"
+KEEPALIVE = b": keepalive\n\n"
+
+
+@dataclass
+class ProjectEvent:
+    id: int
+    project_id: uuid.UUID
+    type: str
+    # The JSON part of the NOTIFY payload, sent as is
+    data: str
+
+    @classmethod
+    def parse(cls, payload: str) -> "ProjectEvent":
+        event_id, _, data = payload.partition(":")
+        body = json.loads(data)
+        return cls(
+            id=int(event_id),
+            project_id=uuid.UUID(body["project_id"]),
+            type=body["type"],
+            data=data,
+        )
+
+    def encode(self) -> bytes:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n".encode()
+
+
+@dataclass(eq=False)
+class Subscription:
+    project_id: uuid.UUID
+    queue: "asyncio.Queue[bytes]"
+    # Set when the stream fell too far behind and stopped receiving events
+    overflowed: bool = False
+
+
+class ProjectEventBroker:
+    """
+    Fans the events that app.crud NOTIFYs out to this worker's SSE streams.
+
+    A single LISTEN connection per worker receives the events of every
+    project. Each event goes to the queues of its project's streams and into
+    a buffer of recent events, from which a reconnecting client is replayed
+    what it missed after its Last-Event-ID. A stream that falls `queue_size`
+    events behind is ended, its client reconnects and catches up from the
+    buffer. After the connection is lost, every stream gets a `reset` event
+    because what happened in between is unknown.
+    """
+
+    def __init__(
+        self,
+        *,
+        dsn: str,
+        buffer_size: int,
+        queue_size: int,
+        keepalive: float,
+        retry_interval: float = 1.0,
+    ) -> None:
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.retry_interval = retry_interval
+        self.recent: deque[ProjectEvent] = deque(maxlen=buffer_size)
+        self.subscriptions: defaultdict[uuid.UUID, set[Subscription]] = defaultdict(set)
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def listen(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    self.dsn, autocommit=True
+                ) as connection:
+                    await connection.execute(f"LISTEN {PROJECT_EVENTS_CHANNEL}")
+                    if connected_before:
+                        self.reset()
+                    connected_before = True
+                    while True:
+                        async for notify in connection.notifies(timeout=self.keepalive):
+                            self.receive(notify.payload)
+                        # Quiet for a while, make sure the connection is still alive
+                        await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Project event listener failed, reconnecting")
+            await asyncio.sleep(self.retry_interval)
+
+    def receive(self, payload: str) -> None:
+        try:
+            event = ProjectEvent.parse(payload)
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring malformed project event: {payload[:200]}")
+            return
+        self.recent.append(event)
+        message = event.encode()
+        for subscription in list(self.subscriptions.get(event.project_id, ())):
+            self.send(subscription, message)
+
+    def send(self, subscription: Subscription, message: bytes) -> None:
+        try:
+            subscription.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            subscription.overflowed = True
+            self.unsubscribe(subscription)
+
+    def reset(self) -> None:
+        self.recent.clear()
+        for subscriptions in list(self.subscriptions.values()):
+            for subscription in list(subscriptions):
+                self.send(subscription, RESET)
+
+    def subscribe(self, project_id: uuid.UUID) -> Subscription:
+        self.start()
+        subscription = Subscription(project_id, asyncio.Queue(self.queue_size))
+        self.subscriptions[project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self.subscriptions.get(subscription.project_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.project_id]
+
+    def replay(
+        self, project_id: uuid.UUID, last_event_id: str
+    ) -> list[ProjectEvent] | None:
+        """Buffered events of a project after `last_event_id`, None if it is not buffered."""
+        missed: list[ProjectEvent] = []
+        for event in reversed(self.recent):
+            if str(event.id) == last_event_id:
+                return missed[::-1]
+            if event.project_id == project_id:
+                missed.append(event)
+        return None
+
+    async def stream(
+        self, project_id: uuid.UUID, last_event_id: str | None = None
+    ) -> AsyncIterator[bytes]:
+        """Server-Sent Events of a project, starting after `last_event_id` if given."""
+        # Subscribing and replaying without awaiting in between leaves no gap
+        subscription = self.subscribe(project_id)
+        try:
+            if last_event_id:
+                missed = self.replay(project_id, last_event_id)
+                if missed is None:
+                    yield RESET
+                else:
+                    for event in missed:
+                        yield event.encode()
+            while not subscription.overflowed or not subscription.queue.empty():
+                try:
+                    yield await asyncio.wait_for(
+                        subscription.queue.get(), timeout=self.keepalive
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield KEEPALIVE
+        finally:
+            self.unsubscribe(subscription)
+
+
+event_broker = ProjectEventBroker(
+    # Plain libpq URL for psycopg, without SQLAlchemy's driver suffix
+    dsn=make_url(str(settings.SQLALCHEMY_DATABASE_URI))
+    .set(drivername="postgresql")
+    .render_as_string(hide_password=False),
+    buffer_size=settings.PROJECT_EVENTS_BUFFER_SIZE,
+    queue_size=settings.PROJECT_EVENTS_QUEUE_SIZE,
+    keepalive=settings.PROJECT_EVENTS_KEEPALIVE,
+)
@@ -0,0 +1,82 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models import Project, ProjectRoleEnum, User
+from app.tests.conftest import QueryBudget
+from app.tests.utils.project import (
+    create_random_member,
+    create_random_project,
+    create_random_task,
+)
+from app.tests.utils.user import user_token_headers
+
+# Project, its tasks, members, their users and the task count of each member
+PROJECT_DETAIL_QUERIES = 5
+# The client's sessions run each request in a savepoint of the test transaction
+SAVEPOINT_QUERIES = 2
+
+
+def create_project_with_members(session: Session, n: int) -> Project:
+    """A project with `n` members besides its owner, each with a task."""
+    project = create_random_project(session)
+    for _ in range(n):
+        create_random_task(session, project, create_random_member(session, project))
+    return project
+
+
+def test_read_project_with_includes_runs_constant_queries(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    rollback_session: Session,
+    assert_query_budget: QueryBudget,
+) -> None:
+    small = create_project_with_members(rollback_session, 1)
+    large = create_project_with_members(rollback_session, 50)
+    # Caches the current user, so that it is loaded by neither request below
+    client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+
+    with assert_query_budget(
+        PROJECT_DETAIL_QUERIES + SAVEPOINT_QUERIES, max_repeats=1
+    ) as stats:
+        for project, n in ((small, 1), (large, 50)):
+            r = client.get(
+                f"{settings.API_V1_STR}/projects/{project.id}",
+                params={"include": "members,members.user,tasks"},
+                headers=superuser_token_headers,
+            )
+            assert r.status_code == 200
+            content = r.json()
+            assert len(content["members"]) == n + 1
+            assert all(member["user"] for member in content["members"])
+            assert len(content["tasks"]) == n
+
+    assert stats[0].count == stats[1].count
+
+
+@pytest.mark.parametrize(
+    "role,status_code",
+    [
+        (ProjectRoleEnum.MANAGER, 200),
+        (ProjectRoleEnum.EMPLOYEE, 403),
+    ],
+)
+def test_bulk_tasks_need_manager(
+    client: TestClient,
+    rollback_session: Session,
+    role: ProjectRoleEnum,
+    status_code: int,
+) -> None:
+    project = create_random_project(rollback_session)
+    member = create_random_member(rollback_session, project, role)
+    task = create_random_task(rollback_session, project)
+    headers = user_token_headers(rollback_session.get_one(User, member.user_id))
+    url = f"{settings.API_V1_STR}/projects/{project.id}/tasks:bulk"
+
+    r = client.post(url, json=[{"title": "bulk"}], headers=headers)
+    assert r.status_code == status_code
+    r = client.patch(
+        url, json={"task_ids": [str(task.id)], "status": "completed"}, headers=headers
+    )
+    assert r.status_code == status_code
@@ -0,0 +1,110 @@
+import uuid
+from collections.abc import Generator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.api import deps
+from app.api.deps import (
+    PRIMARY_PIN_COOKIE,
+    AsyncReadSessionDep,
+    AsyncSessionDep,
+    ReadSessionDep,
+    SessionDep,
+)
+from app.core.config import settings
+from app.core.db import ReplicaSet, engine
+
+# Each TestClient runs its own event loop, so the async engines of these
+# tests pool no connections
+URI = str(settings.SQLALCHEMY_DATABASE_URI)
+async_engine = create_async_engine(URI, poolclass=NullPool)
+
+# Routes on the real session dependencies, reporting where they read from
+pin_app = FastAPI()
+
+
+@pin_app.post("/write")
+def write(session: SessionDep) -> None:
+    session.execute(text("SELECT 1"))
+    session.commit()
+
+
+@pin_app.get("/read")
+def read(session: ReadSessionDep) -> dict[str, bool]:
+    return {"primary": session.get_bind() is engine}
+
+
+@pin_app.post("/async-write")
+async def async_write(session: AsyncSessionDep) -> None:
+    await session.execute(text("SELECT 1"))
+    await session.commit()
+
+
+@pin_app.get("/async-read")
+async def async_read(session: AsyncReadSessionDep) -> dict[str, bool]:
+    return {"primary": session.bind is async_engine}
+
+
+@pytest.fixture(params=["", "async-"], ids=["sync", "async"])
+def prefix(request: pytest.FixtureRequest) -> str:
+    """Path prefix of the routes on the sync or the async dependencies."""
+    prefix: str = request.param
+    return prefix
+
+
+@pytest.fixture
+def pin_client(monkeypatch: pytest.MonkeyPatch) -> Generator[TestClient, None, None]:
+    # A "replica" on the primary, which reports no replication lag
+    replica_engine = create_engine(URI)
+    async_replica_engine = create_async_engine(URI, poolclass=NullPool)
+    replicas = ReplicaSet(
+        [replica_engine],
+        async_engines=[async_replica_engine],
+        check_interval=60,
+        max_lag=10,
+    )
+    monkeypatch.setattr(deps, "replicas", replicas)
+    monkeypatch.setattr(deps, "async_engine", async_engine)
+    with TestClient(pin_app) as client:
+        yield client
+    replica_engine.dispose()
+
+
+def reads_primary(client: TestClient, prefix: str, headers: dict[str, str]) -> bool:
+    r = client.get(f"/{prefix}read", headers=headers)
+    assert r.status_code == 200
+    primary: bool = r.json()["primary"]
+    return primary
+
+
+def test_reads_use_replica(pin_client: TestClient, prefix: str) -> None:
+    assert not reads_primary(pin_client, prefix, {})
+
+
+def test_write_pins_client_by_cookie(pin_client: TestClient, prefix: str) -> None:
+    r = pin_client.post(f"/{prefix}write")
+    assert r.status_code == 200
+    assert PRIMARY_PIN_COOKIE in r.cookies
+    assert reads_primary(pin_client, prefix, {})
+
+    pin_client.cookies.clear()
+    assert not reads_primary(pin_client, prefix, {})
+
+
+def test_write_pins_client_by_authorization(
+    pin_client: TestClient, prefix: str
+) -> None:
+    headers = {"Authorization": f"Bearer {uuid.uuid4()}"}
+    r = pin_client.post(f"/{prefix}write", headers=headers)
+    assert r.status_code == 200
+    # e.g. an API client that doesn't keep cookies
+    pin_client.cookies.clear()
+    assert reads_primary(pin_client, prefix, headers)
+    assert not reads_primary(
+        pin_client, prefix, {"Authorization": f"Bearer {uuid.uuid4()}"}
+    )
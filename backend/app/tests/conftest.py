@@ -0,0 +1,109 @@
+from collections.abc import Callable, Generator, Iterator
+from contextlib import AbstractContextManager, contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Connection
+from sqlmodel import Session
+from starlette.types import Scope
+
+from app.api.deps import get_db, get_read_db
+from app.core.config import settings
+from app.core.db import QueryStats, engine, init_db, query_stats_observers
+from app.main import app
+from app.tests.utils.utils import get_superuser_token_headers
+
+QueryBudget = Callable[..., AbstractContextManager[list[QueryStats]]]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def db() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        init_db(session)
+        yield session
+
+
+@pytest.fixture
+def connection() -> Generator[Connection, None, None]:
+    """Connection in a transaction that is rolled back after the test."""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
+
+
+@pytest.fixture
+def rollback_session(connection: Connection) -> Generator[Session, None, None]:
+    """
+    Session on the rolled back connection. Commits only release a
+    savepoint, so crud functions can be called as they are.
+    """
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+        yield session
+
+
+@pytest.fixture
+def client(connection: Connection) -> Generator[TestClient, None, None]:
+    """TestClient whose requests read and write on the rolled back connection."""
+
+    def get_test_db() -> Generator[Session, None, None]:
+        with Session(
+            bind=connection, join_transaction_mode="create_savepoint"
+        ) as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_read_db] = get_test_db
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def superuser_token_headers(client: TestClient) -> dict[str, str]:
+    return get_superuser_token_headers(client)
+
+
+@pytest.fixture
+def assert_query_budget() -> QueryBudget:
+    """
+    Context manager failing when a request made inside the block with the
+    TestClient runs more than `max_queries` statements, or any statement
+    more than `max_repeats` times. It yields the stats of those requests.
+
+        with assert_query_budget(3, max_repeats=1):
+            client.get(f"{settings.API_V1_STR}/projects/{project.id}")
+    """
+    if not settings.DB_QUERY_STATS:
+        pytest.skip("query budgets need DB_QUERY_STATS")
+
+    @contextmanager
+    def budget(
+        max_queries: int, *, max_repeats: int | None = None
+    ) -> Iterator[list[QueryStats]]:
+        requests: list[str] = []
+        recorded: list[QueryStats] = []
+
+        def observe(scope: Scope, stats: QueryStats) -> None:
+            requests.append(f"{scope['method']} {scope['path']}")
+            recorded.append(stats)
+
+        query_stats_observers.append(observe)
+        try:
+            yield recorded
+        finally:
+            query_stats_observers.remove(observe)
+        for request, stats in zip(requests, recorded, strict=True):
+            assert stats.count <= max_queries, (
+                f"{request} ran {stats.count} queries, the budget is {max_queries}:\n"
+                + "\n".join(f"{n} x {s}" for s, n in stats.statements.items())
+            )
+            if max_repeats is not None:
+                repeated = stats.repeated(max_repeats + 1)
+                assert not repeated, (
+                    f"{request} repeated statements (probable N+1): {repeated}"
+                )
+
+    return budget
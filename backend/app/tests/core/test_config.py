@@ -0,0 +1,22 @@
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+
+
+def make_settings(**values: Any) -> Settings:
+    # The required settings come from the environment
+    return Settings(**values)
+
+
+def test_metrics_default_on_only_locally() -> None:
+    assert make_settings(ENVIRONMENT="local").METRICS_ENABLED
+    assert not make_settings(ENVIRONMENT="staging").METRICS_ENABLED
+    assert make_settings(ENVIRONMENT="staging", METRICS_TOKEN="x").METRICS_ENABLED
+
+
+def test_metrics_need_token_outside_local() -> None:
+    with pytest.raises(ValidationError, match="METRICS_TOKEN"):
+        make_settings(ENVIRONMENT="production", METRICS_ENABLED=True)
@@ -0,0 +1,77 @@
+from collections.abc import Generator
+
+import pytest
+from sqlalchemy import Engine, create_engine, exc, text
+
+from app.core import db
+from app.core.config import settings
+from app.core.db import ReplicaSet, engine
+
+# Nothing listens there, connecting fails at once
+UNREACHABLE_URI = "postgresql+psycopg://postgres@127.0.0.1:1/app"
+
+
+@pytest.fixture
+def replica_engines() -> Generator[list[Engine], None, None]:
+    """Two engines on the primary, which reports no replication lag."""
+    engines = [create_engine(str(settings.SQLALCHEMY_DATABASE_URI)) for _ in range(2)]
+    yield engines
+    for replica_engine in engines:
+        replica_engine.dispose()
+
+
+@pytest.fixture
+def unreachable_engine() -> Generator[Engine, None, None]:
+    unreachable = create_engine(UNREACHABLE_URI, connect_args={"connect_timeout": 1})
+    yield unreachable
+    unreachable.dispose()
+
+
+def test_choose_takes_turns(replica_engines: list[Engine]) -> None:
+    replicas = ReplicaSet(replica_engines, check_interval=60, max_lag=10)
+    assert [replicas.choose() for _ in range(4)] == replica_engines * 2
+
+
+def test_choose_skips_unreachable_replica(
+    replica_engines: list[Engine], unreachable_engine: Engine
+) -> None:
+    replicas = ReplicaSet(
+        [unreachable_engine, replica_engines[0]], check_interval=60, max_lag=10
+    )
+    assert [replicas.choose() for _ in range(3)] == [replica_engines[0]] * 3
+    assert not replicas.replicas[0].healthy
+
+
+def test_choose_falls_back_to_primary(unreachable_engine: Engine) -> None:
+    replicas = ReplicaSet([unreachable_engine], check_interval=60, max_lag=10)
+    assert replicas.choose() is None
+
+
+def test_choose_skips_lagging_replica(
+    replica_engines: list[Engine], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(db, "REPLICA_LAG_QUERY", text("SELECT 30"))
+    replicas = ReplicaSet(replica_engines[:1], check_interval=60, max_lag=10)
+    assert replicas.choose() is None
+    assert replicas.replicas[0].lag_seconds == 30
+
+    monkeypatch.setattr(db, "REPLICA_LAG_QUERY", text("SELECT 5"))
+    replicas.replicas[0].checked_at = float("-inf")
+    assert replicas.choose() is replica_engines[0]
+
+
+def test_dropped_connection_marks_replica_unhealthy(
+    replica_engines: list[Engine],
+) -> None:
+    replicas = ReplicaSet(replica_engines[:1], check_interval=60, max_lag=10)
+    replica_engine = replicas.choose()
+    assert replica_engine is not None
+    with replica_engine.connect() as connection:
+        pid = connection.execute(text("SELECT pg_backend_pid()")).scalar_one()
+        with engine.connect() as primary:
+            primary.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+        with pytest.raises(exc.OperationalError):
+            connection.execute(text("SELECT 1"))
+    assert not replicas.replicas[0].healthy
+    # Until its next check
+    assert replicas.choose() is None
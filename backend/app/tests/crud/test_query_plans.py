@@ -0,0 +1,234 @@
+"""
+Every query shape built in app/crud.py must be able to use an index.
+
+The tables are seeded with enough rows for the planner statistics to look
+like a real tenant, then each statement the crud functions run is EXPLAINed
+with sequential scans priced out. The planner then only falls back to one
+when no usable index exists for the predicate.
+"""
+
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Connection, event, insert
+from sqlmodel import Session, col, select
+
+from app import crud
+from app.models import (
+    CountStrategyEnum,
+    Item,
+    Project,
+    ProjectMember,
+    ProjectMemberBulkItem,
+    ProjectRoleEnum,
+    Task,
+    TaskComment,
+    TasksBulkUpdate,
+    TaskStatusEnum,
+    User,
+)
+from app.tests.utils.utils import random_email, random_lower_string
+
+# Rows seeded per table
+SEED_ROWS = 5000
+
+
+def seed(session: Session) -> dict[str, Any]:
+    user = User(email=random_email(), hashed_password="x")
+    session.add(user)
+    session.flush()
+    project = Project(name=random_lower_string(), owner_id=user.id)
+    session.add(project)
+    session.flush()
+    member = ProjectMember(
+        project_id=project.id, user_id=user.id, role=ProjectRoleEnum.OWNER
+    )
+    session.add(member)
+    session.flush()
+
+    task_ids = [uuid.uuid4() for _ in range(SEED_ROWS)]
+    session.execute(
+        insert(Task),
+        [
+            {
+                "id": task_id,
+                "title": f"task {i}",
+                "status": list(TaskStatusEnum)[i % len(TaskStatusEnum)],
+                "project_id": project.id,
+                "assigned_member_id": member.id if i % 2 else None,
+            }
+            for i, task_id in enumerate(task_ids)
+        ],
+    )
+    session.execute(
+        insert(TaskComment),
+        [
+            {
+                "id": uuid.uuid4(),
+                "task_id": task_ids[i % len(task_ids)],
+                "author_id": user.id,
+                "content": f"comment {i}",
+                "created_at": datetime.utcnow(),
+            }
+            for i in range(SEED_ROWS)
+        ],
+    )
+    session.execute(
+        insert(Item),
+        [
+            {"id": uuid.uuid4(), "title": f"item {i}", "owner_id": user.id}
+            for i in range(SEED_ROWS)
+        ],
+    )
+    session.flush()
+    for table in ("item", "project", "projectmember", "task", "taskcomment", '"user"'):
+        session.connection().exec_driver_sql(f"ANALYZE {table}")
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "project_id": project.id,
+        "task_id": task_ids[0],
+    }
+
+
+def crud_calls(ids: dict[str, Any]) -> list[Callable[[Session], Any]]:
+    """
+    Every query shape built in app/crud.py, plus the owner-scoped items list.
+    The outbox counts are left out, they aggregate the whole table by design.
+    """
+    return [
+        lambda s: crud.get_project_detail(
+            session=s, project_id=ids["project_id"], include=crud.PROJECT_INCLUDES
+        ),
+        lambda s: crud.get_user_by_email(session=s, email=ids["email"]),
+        lambda s: crud.get_project_by_id(session=s, project_id=ids["project_id"]),
+        lambda s: crud.list_projects(session=s, limit=10),
+        lambda s: crud.list_tasks(session=s, limit=10),
+        lambda s: crud.list_tasks(
+            session=s, cursor=crud.encode_cursor([ids["task_id"]]), limit=10
+        ),
+        lambda s: crud.paginate(
+            session=s,
+            statement=select(Item).where(Item.owner_id == ids["user_id"]),
+            keys=[col(Item.id)],
+            limit=10,
+        ),
+        lambda s: crud.get_project_members(session=s, project_id=ids["project_id"]),
+        lambda s: s.exec(
+            select(Task).where(Task.project_id == ids["project_id"])
+        ).all(),
+        lambda s: crud.get_task_by_id(session=s, task_id=ids["task_id"]),
+        lambda s: crud.update_task_status(
+            session=s, task_id=ids["task_id"], new_status=TaskStatusEnum.COMPLETED
+        ),
+        lambda s: crud.get_comments_for_task(session=s, task_id=ids["task_id"]),
+        lambda s: crud.search(
+            session=s, q="comment", user=s.get_one(User, ids["user_id"]), limit=10
+        ),
+        lambda s: crud.remove_member_from_project(
+            session=s, project_id=ids["project_id"], user_id=ids["user_id"]
+        ),
+        lambda s: crud.update_members_bulk(
+            session=s,
+            project_id=ids["project_id"],
+            members_in=[
+                ProjectMemberBulkItem(
+                    user_id=ids["user_id"], role=ProjectRoleEnum.OWNER
+                )
+            ],
+        ),
+        lambda s: crud.update_members_bulk(
+            session=s,
+            project_id=ids["project_id"],
+            members_in=[ProjectMemberBulkItem(email=ids["email"], remove=True)],
+        ),
+        lambda s: crud.update_tasks_bulk(
+            session=s,
+            project_id=ids["project_id"],
+            tasks_in=TasksBulkUpdate(
+                current_status=TaskStatusEnum.PENDING, status=TaskStatusEnum.IN_PROGRESS
+            ),
+        ),
+        lambda s: crud.get_project_role(
+            session=s, project_id=ids["project_id"], user_id=uuid.uuid4()
+        ),
+        lambda s: crud.get_project_version(session=s, project_id=ids["project_id"]),
+        lambda s: crud.get_project_tasks_version(
+            session=s, project_id=ids["project_id"]
+        ),
+        lambda s: crud.get_task_comments_version(session=s, task_id=ids["task_id"]),
+        lambda s: crud.get_project_summary(session=s, project_id=ids["project_id"]),
+        lambda s: list(
+            crud.iter_project_export(session=s, project_id=ids["project_id"])
+        ),
+        lambda s: crud.count_rows(
+            session=s, statement=select(Task), strategy=CountStrategyEnum.ESTIMATED
+        ),
+        lambda s: crud.count_rows(
+            session=s,
+            statement=select(Task).where(Task.project_id == ids["project_id"]),
+            strategy=CountStrategyEnum.EXACT,
+        ),
+        lambda s: crud.claim_outbox_batch(session=s, limit=10, lease=60),
+    ]
+
+
+def capture_statements(
+    connection: Connection, session: Session, calls: list[Callable[[Session], Any]]
+) -> list[tuple[str, Any]]:
+    statements: list[tuple[str, Any]] = []
+
+    def record(
+        _conn: Any,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        executemany: bool,
+    ) -> None:
+        if not executemany and statement.lstrip().upper().startswith(
+            ("SELECT", "UPDATE", "DELETE")
+        ):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        for call in calls:
+            # Bypass the identity map so session.get() really hits the database
+            session.expunge_all()
+            call(session)
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+    return statements
+
+
+def find_seq_scans(plan: dict[str, Any]) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name", "?"))
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+def test_crud_queries_use_indexes(rollback_session: Session) -> None:
+    session = rollback_session
+    connection = session.connection()
+    ids = seed(session)
+    statements = capture_statements(connection, session, crud_calls(ids))
+    assert statements
+
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    seq_scans = []
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        ).scalar_one()
+        tables = find_seq_scans(plan[0]["Plan"])
+        if tables:
+            seq_scans.append(
+                f"Seq Scan on {', '.join(tables)}: {' '.join(statement.split())}"
+            )
+    assert not seq_scans, "\n".join(seq_scans)
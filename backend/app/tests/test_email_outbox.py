@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import Connection, delete
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.email_outbox import EmailOutboxWorker
+from app.models import EmailStatusEnum, OutboxEmail
+
+MAX_ATTEMPTS = 3
+
+
+class FakeResponse:
+    def __init__(self, error: str | None) -> None:
+        self.success = error is None
+        self.error = error
+
+
+class FakeBackend:
+    """SMTP backend that fails for the addresses in `failing`."""
+
+    def __init__(self, connection: Connection, failing: set[str]) -> None:
+        self.connection = connection
+        self.failing = failing
+        self.sent: list[str] = []
+        self.leased: list[bool] = []
+
+    def sendmail(self, *, to_addrs: list[str], **_kwargs: Any) -> FakeResponse:
+        (to,) = to_addrs
+        # Other workers must skip the email while it is being sent
+        with Session(self.connection) as session:
+            email = session.exec(
+                select(OutboxEmail).where(OutboxEmail.email_to == to)
+            ).one()
+            self.leased.append(email.next_attempt_at > datetime.utcnow())  # type: ignore[operator]
+        if to in self.failing:
+            return FakeResponse("550 mailbox unavailable")
+        self.sent.append(to)
+        return FakeResponse(None)
+
+    def close(self) -> None:
+        pass
+
+
+def test_worker_sends_retries_and_gives_up(
+    connection: Connection, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "from@example.com")
+    with Session(connection) as session:
+        # Rolled back with the rest of the test, the worker only sees these
+        session.exec(delete(OutboxEmail))  # type: ignore[call-overload]
+        for email_to, attempts in (
+            ("sent@example.com", 0),
+            ("retried@example.com", 0),
+            ("failed@example.com", MAX_ATTEMPTS - 1),
+        ):
+            session.add(
+                OutboxEmail(
+                    email_to=email_to,
+                    subject="outbox",
+                    html_content="<p>outbox</p>",
+                    attempts=attempts,
+                )
+            )
+        session.commit()
+
+    backend = FakeBackend(connection, {"retried@example.com", "failed@example.com"})
+    worker = EmailOutboxWorker(
+        db_engine=connection,
+        batch_size=10,
+        poll_interval=1,
+        idle_timeout=30,
+        max_attempts=MAX_ATTEMPTS,
+        retry_backoff=30,
+        lease=300,
+        backend_factory=lambda: backend,
+    )
+    assert worker.run_once() == 3
+
+    assert backend.sent == ["sent@example.com"]
+    assert backend.leased == [True, True, True]
+    with Session(connection) as session:
+        emails = {email.email_to: email for email in session.exec(select(OutboxEmail))}
+        assert "sent@example.com" not in emails
+        retried = emails["retried@example.com"]
+        assert retried.status == EmailStatusEnum.PENDING
+        assert retried.attempts == 1
+        assert retried.next_attempt_at > datetime.utcnow()  # type: ignore[operator]
+        assert retried.last_error
+        failed = emails["failed@example.com"]
+        assert failed.status == EmailStatusEnum.FAILED
+        assert failed.attempts == MAX_ATTEMPTS
@@ -0,0 +1,39 @@
+import io
+
+from sqlmodel import Session, select
+
+from app.import_users import import_users
+from app.models import ProjectMember, ProjectRoleEnum, User
+from app.tests.utils.project import create_random_project
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_email
+
+
+def test_import_sets_memberships_of_existing_users(
+    rollback_session: Session,
+) -> None:
+    project = create_random_project(rollback_session)
+    existing = create_random_user(rollback_session)
+    new_email = random_email()
+    csv_file = io.StringIO(
+        "email,full_name,password,project,role\n"
+        f"{existing.email},,,{project.name},manager\n"
+        f"{new_email},New,,{project.name},viewer\n"
+        f"{random_email()},,,no such project,employee\n"
+    )
+
+    result = import_users(session=rollback_session, csv_file=csv_file)
+
+    assert result.created == 1
+    assert result.existing == 1
+    assert result.memberships == 2
+    assert [(e.index, e.detail) for e in result.errors] == [(4, "Project not found")]
+    roles = dict(
+        rollback_session.exec(
+            select(User.email, ProjectMember.role)
+            .join(ProjectMember)
+            .where(ProjectMember.project_id == project.id)
+        ).all()
+    )
+    assert roles[existing.email] == ProjectRoleEnum.MANAGER
+    assert roles[new_email] == ProjectRoleEnum.VIEWER
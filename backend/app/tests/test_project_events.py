@@ -0,0 +1,157 @@
+import json
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import (
+    Project,
+    ProjectEventTypeEnum,
+    ProjectMemberBulkItem,
+    Task,
+    TaskCreate,
+    TasksBulkUpdate,
+    TaskStatusEnum,
+)
+from app.tests.utils.project import (
+    create_random_member,
+    create_random_project,
+    create_random_task,
+)
+
+
+@contextmanager
+def notified_events(session: Session) -> Iterator[list[dict[str, Any]]]:
+    """Events published by the NOTIFY statements run inside the block."""
+    events: list[dict[str, Any]] = []
+
+    def record(
+        _conn: Any,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        _executemany: bool,
+    ) -> None:
+        if "pg_notify" in statement:
+            events.extend(json.loads(payload) for payload in parameters["events"])
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        yield events
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+
+
+WRITES: list[tuple[Callable[[Session, Task], Any], ProjectEventTypeEnum]] = [
+    (
+        lambda s, task: crud.create_task(
+            session=s,
+            project_id=task.project_id,
+            title="events",
+            description=None,
+            assigned_member_id=None,
+        ),
+        ProjectEventTypeEnum.TASK_CREATED,
+    ),
+    (
+        lambda s, task: crud.update_task_status(
+            session=s, task_id=task.id, new_status=TaskStatusEnum.IN_PROGRESS
+        ),
+        ProjectEventTypeEnum.TASK_UPDATED,
+    ),
+    (
+        lambda s, task: crud.add_task_comment(
+            session=s,
+            task_id=task.id,
+            author_id=s.get_one(Project, task.project_id).owner_id,
+            content="events",
+        ),
+        ProjectEventTypeEnum.COMMENT_CREATED,
+    ),
+    (
+        lambda s, task: crud.create_tasks_bulk(
+            session=s, project_id=task.project_id, tasks_in=[TaskCreate(title="events")]
+        ),
+        ProjectEventTypeEnum.TASK_CREATED,
+    ),
+    (
+        lambda s, task: crud.update_tasks_bulk(
+            session=s,
+            project_id=task.project_id,
+            tasks_in=TasksBulkUpdate(
+                task_ids=[task.id], status=TaskStatusEnum.COMPLETED
+            ),
+        ),
+        ProjectEventTypeEnum.TASK_UPDATED,
+    ),
+    (
+        lambda s, task: crud.delete_task(session=s, task_id=task.id),
+        ProjectEventTypeEnum.TASK_DELETED,
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "write,event_type", WRITES, ids=[event_type.value for _, event_type in WRITES]
+)
+def test_write_publishes_project_event(
+    rollback_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+    write: Callable[[Session, Task], Any],
+    event_type: ProjectEventTypeEnum,
+) -> None:
+    monkeypatch.setattr(settings, "PROJECT_EVENTS", True)
+    project = create_random_project(rollback_session)
+    task = create_random_task(rollback_session, project)
+
+    with notified_events(rollback_session) as events:
+        write(rollback_session, task)
+
+    assert [e["type"] for e in events] == [event_type.value]
+    assert events[0]["project_id"] == str(project.id)
+
+
+MEMBER_REMOVALS: list[Callable[[Session, Project, uuid.UUID], Any]] = [
+    lambda s, project, user_id: crud.remove_member_from_project(
+        session=s, project_id=project.id, user_id=user_id
+    ),
+    lambda s, project, user_id: crud.update_members_bulk(
+        session=s,
+        project_id=project.id,
+        members_in=[ProjectMemberBulkItem(user_id=user_id, remove=True)],
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "remove", MEMBER_REMOVALS, ids=["remove_member", "update_members_bulk"]
+)
+def test_removing_member_updates_their_tasks(
+    rollback_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+    remove: Callable[[Session, Project, uuid.UUID], Any],
+) -> None:
+    monkeypatch.setattr(settings, "PROJECT_EVENTS", True)
+    project = create_random_project(rollback_session)
+    member = create_random_member(rollback_session, project)
+    task = create_random_task(rollback_session, project, member)
+    version = task.version
+
+    with notified_events(rollback_session) as events:
+        remove(rollback_session, project, member.user_id)
+
+    # Expunged by the UPDATE ... RETURNING, so this reloads it
+    updated = rollback_session.get_one(Task, task.id)
+    assert updated.assigned_member_id is None
+    assert updated.version != version
+    assert [(e["type"], e["data"]["id"]) for e in events] == [
+        (ProjectEventTypeEnum.TASK_UPDATED.value, str(task.id))
+    ]
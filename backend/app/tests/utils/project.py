@@ -0,0 +1,48 @@
+from sqlmodel import Session
+
+from app.models import Project, ProjectMember, ProjectRoleEnum, Task, User
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_project(session: Session, *, owner: User | None = None) -> Project:
+    """A project with its owner as its first member."""
+    owner = owner or create_random_user(session)
+    project = Project(name=random_lower_string(), owner_id=owner.id)
+    session.add(project)
+    session.flush()
+    session.add(
+        ProjectMember(
+            project_id=project.id, user_id=owner.id, role=ProjectRoleEnum.OWNER
+        )
+    )
+    session.commit()
+    session.refresh(project)
+    return project
+
+
+def create_random_member(
+    session: Session,
+    project: Project,
+    role: ProjectRoleEnum = ProjectRoleEnum.EMPLOYEE,
+) -> ProjectMember:
+    user = create_random_user(session)
+    member = ProjectMember(project_id=project.id, user_id=user.id, role=role)
+    session.add(member)
+    session.commit()
+    session.refresh(member)
+    return member
+
+
+def create_random_task(
+    session: Session, project: Project, member: ProjectMember | None = None
+) -> Task:
+    task = Task(
+        title=random_lower_string(),
+        project_id=project.id,
+        assigned_member_id=member.id if member else None,
+    )
+    session.add(task)
+    session.commit()
+    session.refresh(task)
+    return task
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from app.core.security import create_access_token
+from app.models import User
+from app.tests.utils.utils import random_email
+
+
+def create_random_user(session: Session) -> User:
+    # Not hashed, these users never log in
+    user = User(email=random_email(), hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def user_token_headers(user: User) -> dict[str, str]:
+    token = create_access_token(user.id, expires_delta=timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
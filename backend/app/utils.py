@@ -1,12 +1,14 @@
 import logging
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from emails.message import Message
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
 
 from app.core import security
@@ -22,36 +24,65 @@ class EmailData:
     subject: str
 
 
+# Templates are read and compiled once per process and the compiled code is
+# shared between processes through the bytecode cache. Locally, edited
+# templates are picked up without a restart.
+email_templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=settings.ENVIRONMENT == "local",
+)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
+    return email_templates.get_template(template_name).render(context)
 
 
-def send_email(
-    *,
-    email_to: str,
-    subject: str = "",
-    html_content: str = "",
-) -> None:
-    assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
+def render_email_templates(
+    *, template_name: str, contexts: Iterable[dict[str, Any]]
+) -> list[str]:
+    """Render one template once per context, e.g. for every user of an import."""
+    template = email_templates.get_template(template_name)
+    return [template.render(context) for context in contexts]
+
+
+def build_email(*, subject: str = "", html_content: str = "") -> Message:
+    return Message(
         subject=subject,
         html=html_content,
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
+
+
+def smtp_options() -> dict[str, Any]:
+    options: dict[str, Any] = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
     if settings.SMTP_TLS:
-        smtp_options["tls"] = True
+        options["tls"] = True
     elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
+        options["ssl"] = True
     if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
+        options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+        options["password"] = settings.SMTP_PASSWORD
+    return options
+
+
+def smtp_backend() -> SMTPBackend:
+    """SMTP connection that stays open across sends until closed."""
+    return SMTPBackend(**smtp_options())
+
+
+def send_email(
+    *,
+    email_to: str,
+    subject: str = "",
+    html_content: str = "",
+) -> None:
+    """Send one email inline, API routes go through the outbox instead."""
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    message = build_email(subject=subject, html_content=html_content)
+    with smtp_backend() as backend:
+        response = message.send(to=email_to, smtp=backend)
     logger.info(f"send email result: {response}")
 
 